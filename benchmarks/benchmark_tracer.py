@@ -23,6 +23,7 @@ Date: October 3, 2025
 """
 
 import os
+import re
 import sys
 import subprocess
 import argparse
@@ -41,6 +42,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Trace quality check: lines sampled from the head of the exported trace,
+# and a byte bound on the read (LTTng text lines are a few hundred bytes)
+QUALITY_SAMPLE_LINES = 10000
+QUALITY_SAMPLE_BYTES = 8 * 1024 * 1024
+
+# Up to QUALITY_SAMPLE_LINES newline-terminated lines: one match finds where
+# the sample ends without creating an object per line
+QUALITY_SAMPLE_PATTERN = re.compile(rb'(?:[^\n]*\n){0,%d}' % QUALITY_SAMPLE_LINES)
+
+# Event name prefix of a babeltrace text line, counted over the sample:
+# "[timestamp] (+delta) hostname event_name: { fields }". Anchoring after
+# the timestamp, delta and hostname keeps field text (file names, comm
+# values) from being counted
+QUALITY_EVENT_KIND_PATTERN = re.compile(
+    rb'^\[[^\]\n]*\](?: \([^)\n]*\))?(?: \S+)? (syscall_|ust_)', re.MULTILINE
+)
+
 class LTTngBenchmarkTracer:
     """Automated LTTng tracing for application benchmarks."""
 
@@ -504,6 +522,23 @@ class LTTngBenchmarkTracer:
                     check=False
                 )
 
+    def _export_with(self, tool, trace_dir, output_file):
+        """
+        Convert a binary trace to text with one babeltrace executable.
+
+        The child writes straight into the output file; its stderr goes to
+        an unnamed temporary file rather than a pipe, so nothing from a long
+        export is buffered in this process while it runs.
+        """
+        with open(output_file, 'wb') as out, tempfile.TemporaryFile() as err:
+            result = subprocess.run([tool, str(trace_dir)], stdout=out, stderr=err)
+            if result.returncode != 0:
+                err.seek(0)
+                raise subprocess.CalledProcessError(
+                    result.returncode, result.args,
+                    stderr=err.read().decode(errors='replace').strip()
+                )
+
     def export_trace_text(self, trace_dir, output_file):
         """Export binary trace to text format using babeltrace2."""
         try:
@@ -511,14 +546,7 @@ class LTTngBenchmarkTracer:
 
             # Use babeltrace2 to convert binary trace to text
             try:
-                with open(output_file, 'w') as f:
-                    result = subprocess.run(
-                        ["babeltrace2", str(trace_dir)],
-                        stdout=f,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        check=True
-                    )
+                self._export_with("babeltrace2", trace_dir, output_file)
                 logger.info(" Trace exported successfully using babeltrace2")
                 return True
             except subprocess.CalledProcessError as e:
@@ -526,14 +554,7 @@ class LTTngBenchmarkTracer:
 
                 # Fallback: try babeltrace (version 1)
                 try:
-                    with open(output_file, 'w') as f:
-                        result = subprocess.run(
-                            ["babeltrace", str(trace_dir)],
-                            stdout=f,
-                            stderr=subprocess.PIPE,
-                            text=True,
-                            check=True
-                        )
+                    self._export_with("babeltrace", trace_dir, output_file)
                     logger.info(" Trace exported using babeltrace v1")
                     return True
                 except subprocess.CalledProcessError:
@@ -559,21 +580,30 @@ class LTTngBenchmarkTracer:
         logger.info(" Validating trace quality for sequence capture...")
 
         try:
-            with open(trace_file, 'r') as f:
-                # Sample first 10K lines for analysis
-                lines = []
-                for i, line in enumerate(f):
-                    if i >= 10000:
-                        break
-                    lines.append(line.strip())
-
-            total_events = len(lines)
+            # Sample the first 10K lines: read the head as bytes and bound
+            # the sample in C instead of decoding and iterating line by line
+            with open(trace_file, 'rb') as f:
+                head = f.read(QUALITY_SAMPLE_BYTES)
+
+            end = QUALITY_SAMPLE_PATTERN.match(head).end()
+            total_events = head.count(b'\n', 0, end)
+            if (total_events < QUALITY_SAMPLE_LINES and end < len(head)
+                    and len(head) < QUALITY_SAMPLE_BYTES):
+                # A last line without a trailing newline (a line cut by the
+                # byte bound is left out)
+                end = len(head)
+                total_events += 1
+
             if total_events == 0:
                 logger.error("  Trace file is empty. No events were captured.")
                 return False
 
-            syscall_events = sum(1 for line in lines if 'syscall_' in line)
-            ust_events = sum(1 for line in lines if 'ust_' in line)
+            # Count event names over the sample with one regex scan rather
+            # than testing each line from Python; each event line yields at
+            # most one match, taken at its event name
+            event_kinds = QUALITY_EVENT_KIND_PATTERN.findall(head, 0, end)
+            syscall_events = event_kinds.count(b'syscall_')
+            ust_events = event_kinds.count(b'ust_')
 
             # Report quality metrics
             logger.info(f" Trace Quality Report:")
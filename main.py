@@ -18,8 +18,10 @@ import sys
 import logging
 import argparse
 import json
+import time
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 # Add src to path for imports
@@ -28,7 +30,21 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 from trace_parser import TraceParser
 from entity_extractor import EntityExtractor
 from event_sequence_builder import EventSequenceBuilder
-from graph_builder import GraphBuilder
+from graph_builder import GraphBuilder, BATCH_SIZE
+from json_io import dump_json, load_json
+
+
+@lru_cache(maxsize=4)
+def read_schema(schema_file: Path, mtime_ns: int, size: int) -> dict:
+    """
+    Read a schema file, caching the result per path and file version.
+
+    Orchestrators created repeatedly in one process (e.g. by a benchmark
+    harness) then share one decoded schema, while an edited schema file
+    (new mtime or size) is read again. mtime_ns and size only key the
+    cache. The returned dict is shared and must be treated as read-only.
+    """
+    return load_json(schema_file)
 
 
 class PipelineOrchestrator:
@@ -37,7 +53,14 @@ class PipelineOrchestrator:
     def __init__(self, trace_dir: Path, output_dir: Path, 
                  neo4j_uri: str = "bolt://10.0.2.2:7687",
                  neo4j_user: str = "neo4j",
-                 neo4j_password: str = "sudoroot"):
+                 neo4j_password: str = "sudoroot",
+                 external_streams: bool = False,
+                 offline_import: bool = False,
+                 overwrite_database: bool = False,
+                 parquet_entities: bool = False,
+                 neo4j_home: Optional[Path] = None,
+                 graph_batch_size: int = BATCH_SIZE,
+                 graph_workers: int = 4):
         """
         Initialize pipeline orchestrator.
         
@@ -47,12 +70,33 @@ class PipelineOrchestrator:
             neo4j_uri: Neo4j connection URI
             neo4j_user: Neo4j username
             neo4j_password: Neo4j password
+            external_streams: Store event streams under output_dir/streams
+                instead of inline on EventSequence nodes
+            offline_import: Build the graph with neo4j-admin import from CSV
+                files under output_dir/neo4j_import (database must be stopped)
+            overwrite_database: Confirm that the offline import may replace
+                the target database (required with offline_import)
+            parquet_entities: Pass entity files to the graph stage as Parquet
+            neo4j_home: Neo4j installation whose bin/neo4j-admin runs the
+                offline import (default: neo4j-admin on PATH)
+            graph_batch_size: Rows per UNWIND chunk when loading the graph
+            graph_workers: Concurrent writer sessions when loading the graph
         """
         self.trace_dir = Path(trace_dir)
         self.output_dir = Path(output_dir)
         self.neo4j_uri = neo4j_uri
         self.neo4j_user = neo4j_user
         self.neo4j_password = neo4j_password
+        self.external_streams = external_streams
+        self.offline_import = offline_import
+        self.overwrite_database = overwrite_database
+        self.parquet_entities = parquet_entities
+        self.neo4j_home = Path(neo4j_home) if neo4j_home else None
+        self.graph_batch_size = graph_batch_size
+        self.graph_workers = graph_workers
+        
+        if offline_import and not overwrite_database:
+            raise ValueError("offline_import replaces the target database; set overwrite_database to confirm")
         
         # Create output directories
         self.entities_dir = self.output_dir / "processed_entities"
@@ -72,6 +116,7 @@ class PipelineOrchestrator:
         
         # Metadata
         self.trace_metadata = None
+        self.trace_stat = None
         self.pipeline_stats = {
             'start_time': None,
             'end_time': None,
@@ -87,14 +132,16 @@ class PipelineOrchestrator:
     
     def _load_schema(self) -> Optional[dict]:
         """Load schema configuration."""
-        if self.schema_file.exists():
-            with open(self.schema_file, 'r') as f:
-                schema = json.load(f)
-            logging.info(f"Loaded schema version {schema.get('schema_version', 'unknown')}")
-            return schema
-        else:
+        # One stat both checks existence and keys the schema cache
+        try:
+            stat = self.schema_file.stat()
+        except FileNotFoundError:
             logging.warning(f"Schema file not found: {self.schema_file}")
             return None
+        
+        schema = read_schema(self.schema_file, stat.st_mtime_ns, stat.st_size)
+        logging.info(f"Loaded schema version {schema.get('schema_version', 'unknown')}")
+        return schema
     
     def _load_trace_metadata(self) -> Optional[dict]:
         """Load trace metadata if available."""
@@ -125,6 +172,9 @@ class PipelineOrchestrator:
             # Stage 3: Build event sequences
             self._stage_build_sequences()
             
+            # The graph stage reads everything back from the entity files
+            self._release_stage_data()
+            
             # Stage 4: Build graph
             self._stage_build_graph()
             
@@ -142,15 +192,18 @@ class PipelineOrchestrator:
         logging.info(stage_name)
         logging.info("=" * 70)
         
-        stage_start = datetime.now()
+        stage_start = time.perf_counter()
         
         # Find trace output file
         trace_file = self.trace_dir / "trace_output.txt"
-        if not trace_file.exists():
-            raise FileNotFoundError(f"Trace file not found: {trace_file}")
+        # One stat call both checks existence and gives the size
+        try:
+            self.trace_stat = trace_file.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Trace file not found: {trace_file}") from None
         
         logging.info(f"Parsing trace file: {trace_file.name}")
-        logging.info(f"File size: {trace_file.stat().st_size / 1024 / 1024:.2f} MB")
+        logging.info(f"File size: {self.trace_stat.st_size / 1024 / 1024:.2f} MB")
         
         # Parse
         self.parser = TraceParser(trace_file)
@@ -165,10 +218,11 @@ class PipelineOrchestrator:
         logging.info(f"  Unique event types: {stats['unique_event_types']}")
         logging.info(f"  Time range: {stats['time_range_seconds']:.2f} seconds")
         
-        stage_duration = (datetime.now() - stage_start).total_seconds()
+        stage_duration = time.perf_counter() - stage_start
         self.pipeline_stats['stages']['parse'] = {
             'duration_seconds': stage_duration,
             'events_extracted': len(events),
+            'trace_size_bytes': self.trace_stat.st_size,
             'parse_rate': len(events) / stage_duration if stage_duration > 0 else 0
         }
         logging.info(f"\nStage completed in {stage_duration:.2f} seconds")
@@ -181,16 +235,16 @@ class PipelineOrchestrator:
         logging.info(stage_name)
         logging.info("=" * 70)
         
-        stage_start = datetime.now()
+        stage_start = time.perf_counter()
         
         # Extract
         self.extractor = EntityExtractor(self.parser.events)
         entities = self.extractor.extract_all()
         
         # Save
-        self.extractor.save_entities(self.entities_dir)
+        self.extractor.save_entities(self.entities_dir, parquet=self.parquet_entities)
         
-        stage_duration = (datetime.now() - stage_start).total_seconds()
+        stage_duration = time.perf_counter() - stage_start
         self.pipeline_stats['stages']['extract'] = {
             'duration_seconds': stage_duration,
             'entities_extracted': sum(len(v) for v in entities.values())
@@ -204,7 +258,7 @@ class PipelineOrchestrator:
         logging.info(stage_name)
         logging.info("=" * 70)
         
-        stage_start = datetime.now()
+        stage_start = time.perf_counter()
         
         # Build (pass trace_dir for lsof integration)
         self.sequence_builder = EventSequenceBuilder(
@@ -226,13 +280,25 @@ class PipelineOrchestrator:
             avg_duration = summary['average_durations_ms'].get(operation, 0)
             logging.info(f"    {operation}: {count} sequences (avg {avg_duration:.2f}ms)")
         
-        stage_duration = (datetime.now() - stage_start).total_seconds()
+        stage_duration = time.perf_counter() - stage_start
         self.pipeline_stats['stages']['sequences'] = {
             'duration_seconds': stage_duration,
             'sequences_created': len(sequences)
         }
         logging.info(f"\nStage completed in {stage_duration:.2f} seconds")
     
+    def _release_stage_data(self):
+        """
+        Drop the in-memory events, entities and sequences of stages 1-3.
+        
+        They are already saved to the entity files, which the graph stage
+        streams from; releasing them first keeps peak memory during graph
+        construction down to the load's own batches.
+        """
+        self.parser = None
+        self.extractor = None
+        self.sequence_builder = None
+    
     def _stage_build_graph(self):
         """Stage 4: Build Neo4j knowledge graph."""
         stage_name = "STAGE 4: GRAPH CONSTRUCTION"
@@ -240,7 +306,7 @@ class PipelineOrchestrator:
         logging.info(stage_name)
         logging.info("=" * 70)
         
-        stage_start = datetime.now()
+        stage_start = time.perf_counter()
         
         # Load trace metadata
         self.trace_metadata = self._load_trace_metadata()
@@ -249,9 +315,48 @@ class PipelineOrchestrator:
         self.graph_builder = GraphBuilder(
             uri=self.neo4j_uri,
             user=self.neo4j_user,
-            password=self.neo4j_password
+            password=self.neo4j_password,
+            max_workers=self.graph_workers,
+            stream_dir=self.output_dir / "streams" if self.external_streams else None,
+            batch_size=self.graph_batch_size
         )
         
+        if self.offline_import:
+            # neo4j-admin replaces the whole store, so there is nothing to
+            # clear and no connection. The imported store has no constraints
+            # or indexes until create_graph_schema runs on the restarted
+            # database (main.py --create-schema)
+            try:
+                logging.info("Building layered knowledge graph (offline import)")
+                self.graph_builder.build_graph(
+                    self.entities_dir, self.trace_metadata,
+                    mode="offline", import_dir=self.output_dir / "neo4j_import",
+                    neo4j_admin=self._neo4j_admin()
+                )
+                self.graph_builder.save_statistics(self.stats_dir)
+                logging.warning("Imported graph has no constraints or indexes: start Neo4j, "
+                                "then run main.py --create-schema")
+            finally:
+                self.graph_builder.close()
+        else:
+            self._build_graph_online()
+        
+        stage_duration = time.perf_counter() - stage_start
+        self.pipeline_stats['stages']['graph'] = {
+            'duration_seconds': stage_duration,
+            'nodes_created': self.graph_builder.stats.nodes_created,
+            'relationships_created': self.graph_builder.stats.relationships_created
+        }
+        logging.info(f"\nStage completed in {stage_duration:.2f} seconds")
+    
+    def _neo4j_admin(self) -> str:
+        """Path of the neo4j-admin executable used for offline imports."""
+        if self.neo4j_home is None:
+            return "neo4j-admin"
+        return str(self.neo4j_home / "bin" / "neo4j-admin")
+    
+    def _build_graph_online(self):
+        """Build the graph through Cypher transactions on a live database."""
         if not self.graph_builder.connect():
             raise ConnectionError("Failed to connect to Neo4j database")
         
@@ -270,14 +375,6 @@ class PipelineOrchestrator:
             
         finally:
             self.graph_builder.close()
-        
-        stage_duration = (datetime.now() - stage_start).total_seconds()
-        self.pipeline_stats['stages']['graph'] = {
-            'duration_seconds': stage_duration,
-            'nodes_created': self.graph_builder.stats.nodes_created,
-            'relationships_created': self.graph_builder.stats.relationships_created
-        }
-        logging.info(f"\nStage completed in {stage_duration:.2f} seconds")
     
     def _finalize_pipeline(self):
         """Finalize pipeline and save summary."""
@@ -297,17 +394,35 @@ class PipelineOrchestrator:
         
         # Save pipeline summary
         summary_file = self.output_dir / "pipeline_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump({
-                'start_time': self.pipeline_stats['start_time'].isoformat(),
-                'end_time': self.pipeline_stats['end_time'].isoformat(),
-                'total_duration_seconds': total_duration,
-                'stages': self.pipeline_stats['stages'],
-                'trace_metadata': self.trace_metadata
-            }, f, indent=2)
+        dump_json({
+            'start_time': self.pipeline_stats['start_time'].isoformat(),
+            'end_time': self.pipeline_stats['end_time'].isoformat(),
+            'total_duration_seconds': total_duration,
+            'stages': self.pipeline_stats['stages'],
+            # Reference the trace's metadata file rather than copying it in
+            'trace_metadata_file': str(self.trace_dir / "metadata.json") if self.trace_metadata else None
+        }, summary_file)
         logging.info(f"\nPipeline summary saved to: {summary_file}")
 
 
+def create_graph_schema(neo4j_uri: str, neo4j_user: str, neo4j_password: str):
+    """
+    Create the graph's constraints and indexes without touching its data.
+    
+    The offline import writes a store with no schema, and the online build
+    clears the database before creating it, so this is the step that adds
+    the schema to an imported graph once Neo4j is running again.
+    """
+    graph_builder = GraphBuilder(uri=neo4j_uri, user=neo4j_user,
+                                 password=neo4j_password, max_workers=1)
+    try:
+        if not graph_builder.connect():
+            raise ConnectionError("Failed to connect to Neo4j database")
+        graph_builder.create_constraints_and_indexes()
+    finally:
+        graph_builder.close()
+
+
 def setup_logging(verbose: bool = False):
     """Setup logging configuration."""
     log_level = logging.DEBUG if verbose else logging.INFO
@@ -341,6 +456,9 @@ Examples:
   
   # Enable verbose logging
   python3 main.py --verbose
+  
+  # Add constraints and indexes to an offline-imported graph (Neo4j running)
+  python3 main.py --create-schema
         """
     )
     
@@ -376,6 +494,57 @@ Examples:
         help='Neo4j password (default: password)'
     )
     
+    parser.add_argument(
+        '--external-streams',
+        action='store_true',
+        help='Write event streams to outputs/streams/ and keep only an offset on EventSequence nodes'
+    )
+    
+    parser.add_argument(
+        '--offline-import',
+        action='store_true',
+        help='Cold-build the graph with neo4j-admin import (Neo4j must be stopped)'
+    )
+    
+    parser.add_argument(
+        '--create-schema',
+        action='store_true',
+        help='Only create constraints and indexes on the running database, keeping its data (run after --offline-import)'
+    )
+    
+    parser.add_argument(
+        '--overwrite-database',
+        action='store_true',
+        help='Confirm that --offline-import may replace the target database (required with --offline-import)'
+    )
+    
+    parser.add_argument(
+        '--neo4j-home',
+        type=Path,
+        default=None,
+        help='Neo4j installation directory providing bin/neo4j-admin for --offline-import (default: neo4j-admin on PATH)'
+    )
+    
+    parser.add_argument(
+        '--graph-batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help=f'Rows per UNWIND chunk when loading the graph (default: {BATCH_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--graph-workers',
+        type=int,
+        default=4,
+        help='Concurrent Neo4j writer sessions when loading the graph (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--parquet-entities',
+        action='store_true',
+        help='Save entity files as Parquet instead of JSON (requires pyarrow)'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -384,18 +553,32 @@ Examples:
     
     args = parser.parse_args()
     
+    # neo4j-admin replaces the stopped database's store, and a stopped
+    # database cannot be checked for existing data first
+    if args.offline_import and not args.overwrite_database:
+        parser.error("--offline-import replaces the target database; pass --overwrite-database to confirm")
+    
     # Setup logging
     setup_logging(args.verbose)
     
-    # Validate trace directory
-    if not args.trace.exists():
-        logging.error(f"Trace directory not found: {args.trace}")
-        sys.exit(1)
+    # Schema-only step: needs no trace and leaves the graph's data in place
+    if args.create_schema:
+        try:
+            create_graph_schema(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
+        except Exception as e:
+            logging.error(f"Schema creation failed: {e}")
+            sys.exit(1)
+        logging.info("Constraints and indexes created")
+        sys.exit(0)
     
-    # Check for trace_output.txt
+    # Check for trace_output.txt; the directory is only checked to report
+    # which of the two is missing
     trace_file = args.trace / "trace_output.txt"
     if not trace_file.exists():
-        logging.error(f"trace_output.txt not found in {args.trace}")
+        if not args.trace.exists():
+            logging.error(f"Trace directory not found: {args.trace}")
+        else:
+            logging.error(f"trace_output.txt not found in {args.trace}")
         sys.exit(1)
     
     # Run pipeline
@@ -405,7 +588,14 @@ Examples:
             output_dir=args.output,
             neo4j_uri=args.neo4j_uri,
             neo4j_user=args.neo4j_user,
-            neo4j_password=args.neo4j_password
+            neo4j_password=args.neo4j_password,
+            external_streams=args.external_streams,
+            offline_import=args.offline_import,
+            overwrite_database=args.overwrite_database,
+            parquet_entities=args.parquet_entities,
+            neo4j_home=args.neo4j_home,
+            graph_batch_size=args.graph_batch_size,
+            graph_workers=args.graph_workers
         )
         
         orchestrator.run_complete_pipeline()
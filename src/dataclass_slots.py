@@ -0,0 +1,39 @@
+"""
+Dataclass Slots Module
+======================
+Adds __slots__ to the pipeline's record dataclasses.
+
+Parsed events, entities and sequences are created by the hundred thousand;
+with __slots__ each instance stores its fields in a fixed array instead of
+a per-instance __dict__, which is several times smaller and faster to read.
+dataclass(slots=True) needs Python 3.10, so the class is rebuilt here the
+same way for older interpreters.
+
+Author: Knowledge Graph and LLM Querying for Kernel Traces Project
+Date: October 3, 2025
+"""
+
+from dataclasses import fields
+
+
+def slotted(cls):
+    """
+    Rebuild a dataclass with __slots__ for its fields.
+
+    Apply above @dataclass. Field defaults live in the generated __init__,
+    so the class attributes holding them can be dropped in favour of slots.
+
+    Args:
+        cls: Dataclass to rebuild
+
+    Returns:
+        Equivalent class whose instances have no __dict__
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names:
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
@@ -15,17 +15,45 @@ Date: October 3, 2025
 """
 
 import logging
-import json
 from pathlib import Path
-from typing import List, Dict, Set, Optional
-from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Set, Optional, Tuple
+from dataclasses import dataclass, field, fields
 from collections import defaultdict
+from functools import lru_cache
 
 from trace_parser import KernelEvent
+from dataclass_slots import slotted
+from parquet_io import parquet_available, write_records
+from json_io import dump_json
 
 logger = logging.getLogger(__name__)
 
+# Kinds of events the file and socket passes act on (see _event_kind)
+FILE_OPEN = 'file_open'
+FILE_ACCESS = 'file_access'
+SOCKET_CREATE = 'socket_create'
 
+FILE_ACCESS_SYSCALLS = ('syscall_entry_read', 'syscall_entry_write',
+                        'syscall_entry_pread', 'syscall_entry_pwrite')
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls) -> Tuple[str, ...]:
+    """Field names of a dataclass, computed once per class."""
+    return tuple(f.name for f in fields(cls))
+
+
+def _flat_dict(entity) -> Dict:
+    """
+    Shallow field dict of a flat entity dataclass.
+
+    Equivalent to dataclasses.asdict for these entities, which have no
+    nested dataclasses, without its recursive deep copy of every value.
+    """
+    return {name: getattr(entity, name) for name in _field_names(type(entity))}
+
+
+@slotted
 @dataclass
 class Process:
     """Represents a process in the kernel reality layer."""
@@ -38,9 +66,10 @@ class Process:
     thread_count: int = 0
     
     def to_dict(self):
-        return {k: v for k, v in asdict(self).items() if v is not None}
+        return {k: v for k, v in _flat_dict(self).items() if v is not None}
 
 
+@slotted
 @dataclass
 class Thread:
     """Represents a thread in the kernel reality layer."""
@@ -52,12 +81,13 @@ class Thread:
     cpu_affinity: Optional[List[int]] = None
     
     def to_dict(self):
-        data = {k: v for k, v in asdict(self).items() if v is not None}
+        data = {k: v for k, v in _flat_dict(self).items() if v is not None}
         if self.cpu_affinity:
             data['cpu_affinity'] = self.cpu_affinity
         return data
 
 
+@slotted
 @dataclass
 class File:
     """Represents a file resource in the kernel reality layer."""
@@ -69,11 +99,12 @@ class File:
     access_count: int = 0
     
     def to_dict(self):
-        data = asdict(self)
+        data = _flat_dict(self)
         data['type'] = data.pop('file_type')
         return {k: v for k, v in data.items() if v is not None}
 
 
+@slotted
 @dataclass
 class Socket:
     """Represents a network socket in the kernel reality layer."""
@@ -88,12 +119,13 @@ class Socket:
     first_access: Optional[float] = None
     
     def to_dict(self):
-        data = asdict(self)
+        data = _flat_dict(self)
         if 'socket_type' in data:
             data['type'] = data.pop('socket_type')
         return {k: v for k, v in data.items() if v is not None}
 
 
+@slotted
 @dataclass
 class CPU:
     """Represents a CPU core in the kernel reality layer."""
@@ -101,7 +133,7 @@ class CPU:
     event_count: int = 0
     
     def to_dict(self):
-        return asdict(self)
+        return _flat_dict(self)
 
 
 class EntityExtractor:
@@ -126,6 +158,11 @@ class EntityExtractor:
         self.fd_to_file: Dict[tuple, str] = {}  # (pid, fd) -> file_path
         self.fd_to_socket: Dict[tuple, str] = {}  # (pid, fd) -> socket_key
         
+        # Events routed to the file and socket passes, in trace order
+        self.event_kinds: Dict[str, Optional[str]] = {}  # event_type -> kind
+        self.file_events: List[KernelEvent] = []
+        self.socket_events: List[KernelEvent] = []
+        
         logger.info(f"Initialized EntityExtractor with {len(events)} events")
     
     def extract_all(self) -> Dict[str, any]:
@@ -140,6 +177,7 @@ class EntityExtractor:
         # Extract in order of dependency
         self._extract_processes_and_threads()
         self._extract_cpus()
+        self._route_events()
         self._extract_files()
         self._extract_sockets()
         self._link_threads_to_processes()
@@ -163,39 +201,44 @@ class EntityExtractor:
         """Extract process and thread entities from events."""
         logger.info("Extracting processes and threads")
         
+        processes = self.processes
+        threads = self.threads
+        
         for event in self.events:
-            # Track process
-            if event.pid > 0 and event.pid not in self.processes:
-                self.processes[event.pid] = Process(
-                    pid=event.pid,
+            pid = event.pid
+            tid = event.tid
+            timestamp = event.timestamp
+            
+            # Track process and update its end time (one lookup on a hit)
+            process = processes.get(pid)
+            if process is None and pid > 0:
+                process = processes[pid] = Process(
+                    pid=pid,
                     name=event.process_name,
-                    start_time=event.timestamp
+                    start_time=timestamp
                 )
+            if process is not None:
+                process.end_time = timestamp
             
-            # Update process end time
-            if event.pid in self.processes:
-                self.processes[event.pid].end_time = event.timestamp
-            
-            # Track thread
-            if event.tid > 0 and event.tid not in self.threads:
-                self.threads[event.tid] = Thread(
-                    tid=event.tid,
-                    pid=event.pid,
+            # Track thread and update its end time
+            thread = threads.get(tid)
+            if thread is None and tid > 0:
+                thread = threads[tid] = Thread(
+                    tid=tid,
+                    pid=pid,
                     name=event.process_name,
-                    start_time=event.timestamp
+                    start_time=timestamp
                 )
-                self.pid_to_threads[event.pid].add(event.tid)
-            
-            # Update thread end time
-            if event.tid in self.threads:
-                self.threads[event.tid].end_time = event.timestamp
+                self.pid_to_threads[pid].add(tid)
+            if thread is not None:
+                thread.end_time = timestamp
             
             # Handle process creation events
             if 'sched_process_fork' in event.event_type:
-                parent_pid = event.event_data.get('parent_pid', event.pid)
+                parent_pid = event.event_data.get('parent_pid', pid)
                 child_pid = event.event_data.get('child_pid')
-                if child_pid and child_pid in self.processes:
-                    self.processes[child_pid].parent_pid = parent_pid
+                if child_pid and child_pid in processes:
+                    processes[child_pid].parent_pid = parent_pid
         
         logger.info(f"Extracted {len(self.processes)} processes and {len(self.threads)} threads")
     
@@ -211,46 +254,88 @@ class EntityExtractor:
         
         logger.info(f"Extracted {len(self.cpus)} CPUs")
     
+    @staticmethod
+    def _event_kind(event_type: str) -> Optional[str]:
+        """
+        Classify an event type for the file and socket passes.
+        
+        Args:
+            event_type: Kernel event name
+            
+        Returns:
+            FILE_OPEN, FILE_ACCESS, SOCKET_CREATE, or None if neither pass
+            uses the event
+        """
+        # File open syscalls (also matches openat)
+        if 'syscall_entry_open' in event_type:
+            return FILE_OPEN
+        # Open exits carry the fd; correlating it with the entry's filename
+        # is handled in event sequence processing
+        if 'syscall_exit_open' in event_type:
+            return None
+        # Read/write syscalls - track file access
+        if any(sc in event_type for sc in FILE_ACCESS_SYSCALLS):
+            return FILE_ACCESS
+        # Socket creation (bind/connect carry no address fields to extract yet)
+        if 'syscall_entry_socket' in event_type:
+            return SOCKET_CREATE
+        return None
+    
+    def _route_events(self):
+        """
+        Collect the events the file and socket passes use, in one scan.
+        
+        A trace has few distinct event types, so each is classified once
+        and the passes walk only their own events instead of every event.
+        """
+        event_kinds = self.event_kinds
+        file_events = self.file_events
+        socket_events = self.socket_events
+        
+        for event in self.events:
+            event_type = event.event_type
+            if event_type not in event_kinds:
+                event_kinds[event_type] = self._event_kind(event_type)
+            kind = event_kinds[event_type]
+            if kind is None:
+                continue
+            if kind == SOCKET_CREATE:
+                socket_events.append(event)
+            else:
+                file_events.append(event)
+    
     def _extract_files(self):
         """Extract file entities from syscall events."""
         logger.info("Extracting files")
         
-        for event in self.events:
+        for event in self.file_events:
             # File open syscalls
-            if 'syscall_entry_open' in event.event_type or 'syscall_entry_openat' in event.event_type:
+            if self.event_kinds[event.event_type] == FILE_OPEN:
                 filename = event.event_data.get('filename', event.event_data.get('pathname'))
-                if filename and isinstance(filename, str):
+                # Quoted in the trace, so any non-empty value is a string
+                if filename:
                     filename = filename.strip('"').strip("'")
                     
-                    if filename not in self.files:
-                        self.files[filename] = File(
+                    # Files are keyed by path: one lookup finds or creates the entity
+                    file = self.files.get(filename)
+                    if file is None:
+                        file = self.files[filename] = File(
                             path=filename,
                             file_type='file',
                             first_access=event.timestamp
                         )
                     
-                    self.files[filename].last_access = event.timestamp
-                    self.files[filename].access_count += 1
-            
-            # File open exit - track fd to file mapping
-            elif 'syscall_exit_open' in event.event_type or 'syscall_exit_openat' in event.event_type:
-                ret = event.event_data.get('ret')
-                if ret and ret >= 0:
-                    # Need to correlate with previous entry event to get filename
-                    # This is handled in event sequence processing
-                    pass
+                    file.last_access = event.timestamp
+                    file.access_count += 1
             
             # Read/write syscalls - track file access
-            elif any(sc in event.event_type for sc in ['syscall_entry_read', 'syscall_entry_write', 
-                                                         'syscall_entry_pread', 'syscall_entry_pwrite']):
+            else:
                 fd = event.event_data.get('fd')
                 if fd is not None and fd >= 0:
-                    fd_key = (event.pid, fd)
-                    if fd_key in self.fd_to_file:
-                        filename = self.fd_to_file[fd_key]
-                        if filename in self.files:
-                            self.files[filename].last_access = event.timestamp
-                            self.files[filename].access_count += 1
+                    file = self.files.get(self.fd_to_file.get((event.pid, fd)))
+                    if file is not None:
+                        file.last_access = event.timestamp
+                        file.access_count += 1
         
         logger.info(f"Extracted {len(self.files)} files")
     
@@ -258,35 +343,24 @@ class EntityExtractor:
         """Extract socket entities from network syscall events."""
         logger.info("Extracting sockets")
         
-        for event in self.events:
+        for event in self.socket_events:
             # Socket creation
-            if 'syscall_entry_socket' in event.event_type:
-                family = event.event_data.get('family', 'unknown')
-                sock_type = event.event_data.get('type', 'unknown')
-                protocol = event.event_data.get('protocol', 0)
-                
-                # Create placeholder socket
-                socket_key = f"socket_{event.pid}_{event.timestamp}"
-                if socket_key not in self.sockets:
-                    self.sockets[socket_key] = Socket(
-                        socket_id=socket_key,
-                        address='0.0.0.0',
-                        port=0,
-                        protocol=str(protocol),
-                        family=str(family),
-                        socket_type=str(sock_type),
-                        first_access=event.timestamp
-                    )
+            family = event.event_data.get('family', 'unknown')
+            sock_type = event.event_data.get('type', 'unknown')
+            protocol = event.event_data.get('protocol', 0)
             
-            # Socket bind
-            elif 'syscall_entry_bind' in event.event_type:
-                # Extract address and port if available
-                pass
-            
-            # Socket connect
-            elif 'syscall_entry_connect' in event.event_type:
-                # Extract remote address and port if available
-                pass
+            # Create placeholder socket
+            socket_key = f"socket_{event.pid}_{event.timestamp}"
+            if socket_key not in self.sockets:
+                self.sockets[socket_key] = Socket(
+                    socket_id=socket_key,
+                    address='0.0.0.0',
+                    port=0,
+                    protocol=str(protocol),
+                    family=str(family),
+                    socket_type=str(sock_type),
+                    first_access=event.timestamp
+                )
         
         logger.info(f"Extracted {len(self.sockets)} sockets")
     
@@ -296,30 +370,46 @@ class EntityExtractor:
             if pid in self.processes:
                 self.processes[pid].thread_count = len(thread_ids)
     
-    def save_entities(self, output_dir: Path):
+    def save_entities(self, output_dir: Path, parquet: bool = False):
         """
         Save extracted entities to JSON files.
         
         Args:
             output_dir: Directory to save entity files
+            parquet: Write Parquet files instead of JSON (requires pyarrow)
         """
         output_dir.mkdir(parents=True, exist_ok=True)
         
+        if parquet and not parquet_available():
+            logger.warning("pyarrow not installed; saving entities as JSON")
+            parquet = False
+        suffix, stale_suffix = ('.parquet', '.json') if parquet else ('.json', '.parquet')
+        
         logger.info(f"Saving entities to {output_dir}")
         
-        # Save each entity type
+        # Save each entity type; rows are built one type at a time so only
+        # a single list of dicts is alive during serialization
         entities = {
-            'processes': [p.to_dict() for p in self.processes.values()],
-            'threads': [t.to_dict() for t in self.threads.values()],
-            'files': [f.to_dict() for f in self.files.values()],
-            'sockets': [s.to_dict() for s in self.sockets.values()],
-            'cpus': [c.to_dict() for c in self.cpus.values()]
+            'processes': self.processes,
+            'threads': self.threads,
+            'files': self.files,
+            'sockets': self.sockets,
+            'cpus': self.cpus
         }
         
-        for entity_type, entity_list in entities.items():
-            output_file = output_dir / f"{entity_type}.json"
-            with open(output_file, 'w') as f:
-                json.dump(entity_list, f, indent=2)
+        for entity_type, entity_map in entities.items():
+            entity_list = [e.to_dict() for e in entity_map.values()]
+            output_file = output_dir / f"{entity_type}{suffix}"
+            if parquet:
+                write_records(entity_list, output_file)
+            else:
+                # Compact output: these files are read back by the graph
+                # builder, and indentation makes them 2-3x larger
+                dump_json(entity_list, output_file, indent=False)
+            # Remove the other format from an earlier run so it cannot be loaded instead
+            stale_file = output_dir / f"{entity_type}{stale_suffix}"
+            if stale_file.exists():
+                stale_file.unlink()
             logger.info(f"  Saved {len(entity_list)} {entity_type} to {output_file.name}")
         
         # Save summary
@@ -334,8 +424,7 @@ class EntityExtractor:
         }
         
         summary_file = output_dir / "extraction_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        dump_json(summary, summary_file)
         logger.info(f"  Saved extraction summary to {summary_file.name}")
     
     def _get_time_range(self) -> Dict[str, float]:
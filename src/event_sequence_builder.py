@@ -13,18 +13,23 @@ Author: Knowledge Graph and LLM Querying for Kernel Traces Project
 Date: October 3, 2025
 """
 
+import sys
 import logging
 import json
 from pathlib import Path
 from typing import List, Dict, Optional, Set
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields
 from collections import defaultdict
+from operator import attrgetter, itemgetter
 
 from trace_parser import KernelEvent
+from dataclass_slots import slotted
+from json_io import dump_json
 
 logger = logging.getLogger(__name__)
 
 
+@slotted
 @dataclass
 class EventSequence:
     """Represents a sequence of related kernel events forming a logical operation."""
@@ -46,11 +51,22 @@ class EventSequence:
         return (self.end_time - self.start_time) * 1000
     
     def to_dict(self):
-        data = asdict(self)
+        # Shallow copy: event_stream is shared rather than deep-copied
+        data = {name: getattr(self, name) for name in SEQUENCE_FIELDS}
         data['duration_ms'] = self.duration_ms
         return data
 
 
+# Field names of EventSequence, resolved once rather than per to_dict call
+SEQUENCE_FIELDS = tuple(f.name for f in fields(EventSequence))
+
+# Syscalls whose return value is a new fd for the opened path
+OPEN_SYSCALLS = frozenset(('open', 'openat', 'openat2'))
+
+# Entry parameters kept in each event stream entry
+KEY_PARAMS = frozenset(('fd', 'count', 'buf', 'flags', 'offset'))
+
+
 class EventSequenceBuilder:
     """Builds EventSequence nodes by grouping related kernel events."""
     
@@ -117,7 +133,7 @@ class EventSequenceBuilder:
         # Time-aware file descriptor tracking: (pid, fd) -> List[(start_time, end_time, path)]
         # Tracks FD lifecycle with temporal ranges to handle FD reuse correctly
         # end_time=None means FD is still open
-        self.fd_map: Dict[tuple, List[tuple]] = {}  # (pid, fd) -> [(start, end, path), ...]
+        self.fd_map: Dict[tuple, List[tuple]] = defaultdict(list)  # (pid, fd) -> [(start, end, path), ...]
         self.fd_mappings_created = 0
         self.fd_mappings_resolved = 0
         self.fd_mappings_cleaned = 0
@@ -176,7 +192,7 @@ class EventSequenceBuilder:
                 try:
                     current_pid = int(line[1:])
                 except ValueError:
-                    logger.debug(f"Could not parse PID from: {line}")
+                    logger.debug("Could not parse PID from: %s", line)
                     current_pid = None
             
             elif line.startswith('f'):
@@ -225,13 +241,9 @@ class EventSequenceBuilder:
             # Pre-populate fd_map with lsof data
             # Use timestamp 0.0 as start (before trace) and None as end (still open)
             for (pid, fd), file_path in all_fd_mappings.items():
-                key = (pid, fd)
-                if key not in self.fd_map:
-                    self.fd_map[key] = []
-                
                 # Add lsof mapping with timestamp 0.0 (pre-trace)
                 # This will be overridden if we see an open() during trace
-                self.fd_map[key].append((0.0, None, file_path))
+                self.fd_map[(pid, fd)].append((0.0, None, file_path))
                 self.fd_mappings_from_lsof += 1
             
             logger.info(f"Loaded {len(all_fd_mappings)} FD mappings from lsof initial state")
@@ -255,14 +267,27 @@ class EventSequenceBuilder:
         logger.info(f"Paired {len(syscall_pairs)} syscall entry/exit events")
         logger.info(f"FD map built: {len(self.fd_map)} active mappings")
         
-        # Second pass: Group pairs into sequences (now fd_map is populated)
+        # Second pass: Group pairs into sequences (now fd_map is populated).
+        # Each pair is routed to its operations in one pass over the pairs,
+        # through a syscall -> operations table built once from the rules
+        syscall_operations = defaultdict(list)
+        for operation, rule in self.GROUPING_RULES.items():
+            # dict.fromkeys: a syscall listed twice in a rule still routes once
+            for syscall in dict.fromkeys(rule['syscalls']):
+                syscall_operations[syscall].append(operation)
+        
+        operation_pairs = {operation: [] for operation in self.GROUPING_RULES}
+        for pair in syscall_pairs:
+            for operation in syscall_operations.get(pair['syscall_name'], ()):
+                operation_pairs[operation].append(pair)
+        
         for operation, rule in self.GROUPING_RULES.items():
-            operation_sequences = self._group_by_rule(syscall_pairs, operation, rule)
+            operation_sequences = self._group_by_rule(operation_pairs[operation], operation, rule)
             self.sequences.extend(operation_sequences)
             logger.debug(f"Created {len(operation_sequences)} sequences for operation: {operation}")
         
         # Sort sequences by start time
-        self.sequences.sort(key=lambda s: s.start_time)
+        self.sequences.sort(key=attrgetter('start_time'))
         
         logger.info(f"Built {len(self.sequences)} event sequences")
         logger.info(f"FD tracking: {self.fd_mappings_from_lsof} from lsof, {self.fd_mappings_created} from trace, {self.fd_mappings_resolved} resolved, {self.fd_mappings_cleaned} closed")
@@ -277,50 +302,79 @@ class EventSequenceBuilder:
             List of paired syscall dictionaries
         """
         pairs = []
+        append_pair = pairs.append
         pending_entries = {}  # (tid, syscall_name) -> entry_event
         
+        # Event type -> (is_entry, syscall_name), or None for non-syscall
+        # events; a trace has few distinct types, so each is classified once
+        syscall_kinds = {}
+        
         for event in self.events:
-            if 'syscall_entry' in event.event_type:
-                # Extract syscall name
-                syscall_name = event.event_type.replace('syscall_entry_', '')
-                key = (event.tid, syscall_name)
+            event_type = event.event_type
+            if event_type not in syscall_kinds:
+                syscall_kinds[event_type] = self._syscall_kind(event_type)
+            kind = syscall_kinds[event_type]
+            if kind is None:
+                continue
+            
+            is_entry, syscall_name = kind
+            key = (event.tid, syscall_name)
+            if is_entry:
                 pending_entries[key] = event
-                
-            elif 'syscall_exit' in event.event_type:
-                # Extract syscall name
-                syscall_name = event.event_type.replace('syscall_exit_', '')
-                key = (event.tid, syscall_name)
-                
-                if key in pending_entries:
-                    entry_event = pending_entries.pop(key)
-                    
-                    # Create paired syscall
-                    pair = {
-                        'syscall_name': syscall_name,
-                        'tid': event.tid,
-                        'pid': event.pid,
-                        'process_name': event.process_name,
-                        'cpu_id': event.cpu_id,
-                        'start_time': entry_event.timestamp,
-                        'end_time': event.timestamp,
-                        'duration': event.timestamp - entry_event.timestamp,
-                        'entry_data': entry_event.event_data,
-                        'exit_data': event.event_data,
-                        'return_value': event.event_data.get('ret', None)
-                    }
-                    pairs.append(pair)
-                    
-                    # Update fd→file mapping for open/close syscalls
-                    self._update_fd_mapping(pair)
+                continue
+            
+            entry_event = pending_entries.pop(key, None)
+            if entry_event is None:
+                continue
+            
+            # Create paired syscall
+            pair = {
+                'syscall_name': syscall_name,
+                'tid': event.tid,
+                'pid': event.pid,
+                'process_name': event.process_name,
+                'cpu_id': event.cpu_id,
+                'start_time': entry_event.timestamp,
+                'end_time': event.timestamp,
+                'duration': event.timestamp - entry_event.timestamp,
+                'entry_data': entry_event.event_data,
+                'exit_data': event.event_data,
+                'return_value': event.event_data.get('ret', None)
+            }
+            append_pair(pair)
+            
+            # Update fd→file mapping for open/close syscalls
+            self._update_fd_mapping(pair)
         
         return pairs
     
-    def _group_by_rule(self, syscall_pairs: List[Dict], operation: str, rule: Dict) -> List[EventSequence]:
+    @staticmethod
+    def _syscall_kind(event_type: str) -> Optional[tuple]:
+        """
+        Classify an event type for syscall pairing.
+        
+        Syscall names are interned, so the entry and exit types of a
+        syscall share one name object: pending-entry keys then compare by
+        identity, and every pair and event stream entry references that
+        single string.
+        
+        Returns:
+            (True, syscall_name) for syscall entries, (False, syscall_name)
+            for exits, or None for any other event
+        """
+        if 'syscall_entry' in event_type:
+            return (True, sys.intern(event_type.replace('syscall_entry_', '')))
+        if 'syscall_exit' in event_type:
+            return (False, sys.intern(event_type.replace('syscall_exit_', '')))
+        return None
+    
+    def _group_by_rule(self, matching_pairs: List[Dict], operation: str, rule: Dict) -> List[EventSequence]:
         """
         Group syscall pairs into sequences based on a rule.
         
         Args:
-            syscall_pairs: List of paired syscalls
+            matching_pairs: Paired syscalls matching the rule's syscalls,
+                in pairing order
             operation: Operation name
             rule: Grouping rule configuration
             
@@ -329,12 +383,6 @@ class EventSequenceBuilder:
         """
         sequences = []
         
-        # Filter syscalls matching this operation
-        matching_pairs = [
-            p for p in syscall_pairs 
-            if p['syscall_name'] in rule['syscalls']
-        ]
-        
         if not matching_pairs:
             return sequences
         
@@ -362,7 +410,7 @@ class EventSequenceBuilder:
         
         for group_key, group_pairs in groups.items():
             # Sort by time
-            group_pairs.sort(key=lambda p: p['start_time'])
+            group_pairs.sort(key=itemgetter('start_time'))
             
             if immediate:
                 # Each syscall is its own sequence
@@ -458,7 +506,7 @@ class EventSequenceBuilder:
                 'return_value': pair['return_value'],
                 'key_params': {
                     k: v for k, v in pair['entry_data'].items()
-                    if k in ['fd', 'count', 'buf', 'flags', 'offset']
+                    if k in KEY_PARAMS
                 }
             }
             event_stream.append(event_obj)
@@ -490,23 +538,20 @@ class EventSequenceBuilder:
         return_value = pair.get('return_value')
         
         # Handle open/openat syscalls - create fd→file mapping
-        if syscall_name in ['open', 'openat', 'openat2']:
+        if syscall_name in OPEN_SYSCALLS:
             # Return value is the fd (if >= 0)
             if return_value is not None and return_value >= 0:
                 fd = return_value
                 # Get filename from entry parameters
                 filename = pair['entry_data'].get('filename')
                 if filename:
-                    # Clean up filename (remove quotes if present)
-                    if isinstance(filename, str):
-                        filename = filename.strip('"').strip("'")
+                    # Clean up filename (remove quotes if present); quoted
+                    # in the trace, so any non-empty value is a string
+                    filename = filename.strip('"').strip("'")
                     
                     # Store temporal mapping: (start_time, end_time, path)
-                    key = (pid, fd)
-                    if key not in self.fd_map:
-                        self.fd_map[key] = []
                     # Append new mapping with start time, end_time=None (still open)
-                    self.fd_map[key].append((pair['start_time'], None, filename))
+                    self.fd_map[(pid, fd)].append((pair['start_time'], None, filename))
                     self.fd_mappings_created += 1
         
         # Handle socket syscalls - create fd→socket_id mapping
@@ -519,11 +564,8 @@ class EventSequenceBuilder:
                 socket_id = f"socket_{pid}_{pair['start_time']}"
                 
                 # Store temporal mapping: (start_time, end_time, socket_id)
-                key = (pid, fd)
-                if key not in self.fd_map:
-                    self.fd_map[key] = []
                 # Append new mapping with start time, end_time=None (still open)
-                self.fd_map[key].append((pair['start_time'], None, socket_id))
+                self.fd_map[(pid, fd)].append((pair['start_time'], None, socket_id))
                 self.fd_mappings_created += 1
         
         # Handle close syscalls - mark the active mapping as closed
@@ -532,14 +574,16 @@ class EventSequenceBuilder:
             return_value = pair.get('return_value')
             # Only mark closed if close succeeded (return value 0)
             if fd is not None and return_value == 0:
-                key = (pid, fd)
-                if key in self.fd_map and self.fd_map[key]:
+                # .get rather than indexing: a close of an untracked fd
+                # must not add an empty entry to the defaultdict
+                mappings = self.fd_map.get((pid, fd))
+                if mappings:
                     # Find the most recent open mapping (end_time=None)
-                    for i in range(len(self.fd_map[key]) - 1, -1, -1):
-                        start, end, path = self.fd_map[key][i]
+                    for i in range(len(mappings) - 1, -1, -1):
+                        start, end, path = mappings[i]
                         if end is None:  # This mapping is still open
                             # Update it with close time
-                            self.fd_map[key][i] = (start, pair['end_time'], path)
+                            mappings[i] = (start, pair['end_time'], path)
                             self.fd_mappings_cleaned += 1
                             break
     
@@ -560,14 +604,14 @@ class EventSequenceBuilder:
         Returns:
             File path or socket_id valid at op_time, None if not found
         """
-        key = (pid, fd)
-        if key not in self.fd_map:
+        mappings = self.fd_map.get((pid, fd))
+        if not mappings:
             return None
         
         # Find mapping where: start_time <= op_time <= end_time (or end_time is None)
         # The list is ordered, with lsof entries (start_time=0.0) first,
         # then runtime entries in chronological order
-        for start_time, end_time, path in self.fd_map[key]:
+        for start_time, end_time, path in mappings:
             if start_time <= op_time:
                 if end_time is None or op_time <= end_time:
                     return path
@@ -584,29 +628,31 @@ class EventSequenceBuilder:
         output_dir.mkdir(parents=True, exist_ok=True)
         
         output_file = output_dir / "event_sequences.json"
-        sequences_data = [seq.to_dict() for seq in self.sequences]
         
-        with open(output_file, 'w') as f:
-            json.dump(sequences_data, f, indent=2)
+        # The largest intermediate file: written compact, as indentation
+        # roughly doubles its size and serialization time. Sequences are
+        # converted as the encoder reaches them, so no list of dicts is built
+        dump_json(self.sequences, output_file, indent=False, default=EventSequence.to_dict)
         
         logger.info(f"Saved {len(self.sequences)} event sequences to {output_file.name}")
         
         # Save summary statistics
         summary = self._generate_summary()
         summary_file = output_dir / "sequence_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        dump_json(summary, summary_file)
         logger.info(f"Saved sequence summary to {summary_file.name}")
     
     def _generate_summary(self) -> Dict[str, any]:
         """Generate summary statistics for sequences."""
         operation_counts = defaultdict(int)
-        operation_durations = defaultdict(list)
+        operation_total_ms = defaultdict(float)
         total_bytes = 0
         
+        # Running totals: averages only need the sum and count per operation,
+        # not a list of every duration
         for seq in self.sequences:
             operation_counts[seq.operation] += 1
-            operation_durations[seq.operation].append(seq.duration_ms)
+            operation_total_ms[seq.operation] += seq.duration_ms
             total_bytes += seq.bytes_transferred or 0
         
         return {
@@ -614,8 +660,8 @@ class EventSequenceBuilder:
             'operations': dict(operation_counts),
             'total_bytes_transferred': total_bytes,
             'average_durations_ms': {
-                op: sum(durations) / len(durations) if durations else 0
-                for op, durations in operation_durations.items()
+                op: total_ms / operation_counts[op]
+                for op, total_ms in operation_total_ms.items()
             }
         }
     
@@ -12,31 +12,201 @@ Author: Knowledge Graph and LLM Querying for Kernel Traces Project
 Date: October 3, 2025
 """
 
+import os
+import sys
+import atexit
 import logging
-import json
 from pathlib import Path
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, WRITE_ACCESS
 from neo4j.exceptions import ServiceUnavailable, AuthError
 
+from json_io import iter_json_items, dumps_compact, dump_json
+from offline_import import OfflineImporter
+from parquet_io import parquet_available, read_records
+
 logger = logging.getLogger(__name__)
 
+# Default rows sent per UNWIND chunk; keeps Bolt messages and tx state bounded
+BATCH_SIZE = 5000
+
+# Smaller chunks for concurrent shards: with several writers committing at
+# once, shorter transactions hold relationship locks for less time
+PARALLEL_BATCH_SIZE = 2000
+
+# Rows committed per transaction by a lone writer: several UNWIND chunks
+# share one commit (and its log flush). Concurrent shards commit every chunk
+TRANSACTION_ROWS = 100000
+
+# How long to wait for new indexes to come online before loading
+INDEX_WAIT_SECONDS = 300
+
+# Driver connection pool settings: connections are kept alive between
+# batches, and writers wait up to a minute for a free one instead of failing
+DRIVER_CONFIG = {
+    'max_connection_pool_size': 64,
+    'connection_acquisition_timeout': 60,
+    'keep_alive': True
+}
+
+# Drivers shared by every builder in the process, keyed on (uri, user,
+# password). A driver owns a thread-safe connection pool, so later builds
+# reuse its open Bolt connections instead of reconnecting. _DRIVER_REFS
+# counts the builders currently holding each one
+_DRIVERS: Dict[Tuple[str, str, str], object] = {}
+_DRIVER_REFS: Counter = Counter()
+
+# External event stream store, one compact JSON array per line
+STREAMS_FILE = "event_streams.jsonl"
+
+# Operations whose socket target becomes a Socket node
+SOCKET_OPERATIONS = frozenset(('socket_send', 'socket_recv', 'socket'))
+
+# Unique key property per node label (matches the uniqueness constraints)
+NODE_KEYS = {
+    'Process': 'pid',
+    'Thread': 'tid',
+    'File': 'path',
+    'Socket': 'socket_id',
+    'CPU': 'cpu_id',
+    'EventSequence': 'sequence_id'
+}
+
+# Loads through APOC: the UNWIND line of each node or relationship query is
+# replaced by apoc.periodic.iterate's own batching. Batches commit in
+# parallel on the server only when $parallel is set, i.e. when no two rows
+# touch the same node (see _endpoints_unique)
+APOC_ITERATE_QUERY = """
+CALL apoc.periodic.iterate(
+    'UNWIND $rows AS r RETURN r',
+    $action,
+    {batchSize: $batch_size, parallel: $parallel, concurrency: $concurrency, retries: 3, params: {rows: $rows}}
+)
+YIELD batches, failedOperations, errorMessages, updateStatistics
+RETURN batches, failedOperations, errorMessages, updateStatistics
+"""
+
+# Neo4j integers are signed 64-bit; larger values (unsigned syscall return
+# values, summed byte counts) are stored as strings rather than failing the
+# whole batch. Only these properties can hold such values.
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+WIDE_INT_PROPERTIES = ('return_value', 'bytes_transferred')
+
+# Defaults filled in once at load time so entity dicts can be sent to
+# Neo4j as-is (missing keys with no default are simply not stored)
+ENTITY_DEFAULTS = {
+    'processes': {'thread_count': 0},
+    'files': {'access_count': 0},
+    'event_sequences': {'bytes_transferred': 0, 'duration_ms': 0, 'cpu_id': -1}
+}
+
+# Bulk load queries; each takes one chunk of rows as $rows. Nodes are
+# MERGEd on their unique key so re-running a build never hits the
+# uniqueness constraints
+CREATE_NODE_QUERIES = {
+    label: f"UNWIND $rows AS r MERGE (n:{label} {{{key}: r.{key}}}) ON CREATE SET n += r"
+    for label, key in NODE_KEYS.items()
+}
+
+# Properties stored on each relationship type; relationship rows carry a
+# field of the same name for each (plus the two endpoint keys)
+RELATIONSHIP_PROPERTIES = {
+    'CONTAINS': ('creation_time',),
+    'PERFORMED': ('start_time', 'end_time', 'cpu'),
+    'SCHEDULED_ON': ('execution_count',),
+    'WAS_TARGET_OF': ('access_type',)
+}
+
 
 @dataclass
 class GraphStats:
     """Statistics about the constructed graph."""
     nodes_created: int = 0
     relationships_created: int = 0
-    node_counts: Dict[str, int] = None
-    relationship_counts: Dict[str, int] = None
+    node_counts: Counter = field(default_factory=Counter)
+    relationship_counts: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class SequenceGroups:
+    """
+    Relationship rows and node references grouped per EventSequence.
     
-    def __post_init__(self):
-        if self.node_counts is None:
-            self.node_counts = {}
-        if self.relationship_counts is None:
-            self.relationship_counts = {}
+    Filled in while the sequences stream in (see _stream_event_sequences),
+    so the kernel layer only flushes these buckets instead of scanning the
+    sequences again for each relationship type.
+    """
+    count: int = 0
+    thread_ids: set = field(default_factory=set)
+    file_targets: set = field(default_factory=set)
+    socket_ids: set = field(default_factory=set)
+    performed_rows: List[Dict] = field(default_factory=list)
+    file_target_rows: List[Dict] = field(default_factory=list)
+    socket_target_rows: List[Dict] = field(default_factory=list)
+    execution_counts: Counter = field(default_factory=Counter)
+
+
+def get_driver(uri: str, user: str, password: str):
+    """
+    Return the process-wide driver for a server and credentials.
+
+    Each call takes a reference that must be given back with release_driver.
+
+    Args:
+        uri: Neo4j connection URI
+        user: Database username
+        password: Database password
+
+    Returns:
+        Neo4j driver, created on first use
+    """
+    key = (uri, user, password)
+    driver = _DRIVERS.get(key)
+    if driver is None:
+        driver = GraphDatabase.driver(uri, auth=(user, password), **DRIVER_CONFIG)
+        _DRIVERS[key] = driver
+    _DRIVER_REFS[key] += 1
+    return driver
+
+
+def release_driver(uri: str, user: str, password: str, discard: bool = False):
+    """
+    Give back a reference taken with get_driver.
+
+    The driver stays cached for later builders once unreferenced; it is
+    closed by close_drivers at exit. With discard (e.g. after a failed
+    connection) it is instead closed and forgotten as soon as no other
+    builder holds it, so the next get_driver starts afresh.
+
+    Args:
+        uri: Neo4j connection URI
+        user: Database username
+        password: Database password
+        discard: Close the driver once its last reference is released
+    """
+    key = (uri, user, password)
+    _DRIVER_REFS[key] -= 1
+    if _DRIVER_REFS[key] > 0:
+        return
+    del _DRIVER_REFS[key]
+    if discard:
+        driver = _DRIVERS.pop(key, None)
+        if driver is not None:
+            driver.close()
+
+
+@atexit.register
+def close_drivers():
+    """Close every shared driver."""
+    _DRIVER_REFS.clear()
+    while _DRIVERS:
+        _, driver = _DRIVERS.popitem()
+        driver.close()
 
 
 class GraphBuilder:
@@ -44,7 +214,11 @@ class GraphBuilder:
     
     def __init__(self, uri: str = "bolt://10.0.2.2:7687", 
                  user: str = "neo4j", 
-                 password: str = "sudoroot"):
+                 password: str = "sudoroot",
+                 max_workers: int = 4,
+                 stream_dir: Optional[Path] = None,
+                 database: str = "neo4j",
+                 batch_size: int = BATCH_SIZE):
         """
         Initialize graph builder.
         
@@ -52,24 +226,63 @@ class GraphBuilder:
             uri: Neo4j connection URI
             user: Neo4j username
             password: Neo4j password
+            max_workers: Concurrent writer sessions used for bulk loads
+            stream_dir: If set, event streams are written to
+                stream_dir/event_streams.jsonl and EventSequence nodes keep
+                only a stream_offset into it instead of an inline event_stream
+            database: Target database; naming it spares every session a
+                home-database resolution round-trip
+            batch_size: Rows sent per UNWIND chunk
         """
         self.uri = uri
         self.user = user
         self.password = password
+        self.database = database
         self.driver = None
         self.stats = GraphStats()
         
+        # Writer pool: each worker opens its own session from the driver pool
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        self.stream_dir = stream_dir
+        
+        # Set for the duration of an offline build (see build_graph)
+        self.importer = None
+        
+        # Whether nodes and relationships load through APOC (detected in connect)
+        self.apoc_available = False
+        
+        # Relationship queries by (type, start label, end label), so each
+        # distinct query string is built once and reused verbatim
+        self._query_cache: Dict[Tuple[str, str, str], str] = {}
+        
+        # Write queries already planned by the server (see _plan_once)
+        self._planned: set = set()
+        
+        # Unique keys already written per label, for de-duplication
+        self._created_keys: Dict[str, set] = {}
+        
         logger.info(f"Initialized GraphBuilder for {uri}")
     
     def connect(self):
         """Establish connection to Neo4j database."""
         try:
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            if self.driver is None:
+                self.driver = get_driver(self.uri, self.user, self.password)
             # Test connection
-            with self.driver.session() as session:
-                result = session.run("RETURN 1")
-                result.single()
+            try:
+                with self.driver.session(database=self.database) as session:
+                    session.run("RETURN 1").consume()
+            except Exception:
+                release_driver(self.uri, self.user, self.password, discard=True)
+                self.driver = None
+                raise
             logger.info("Successfully connected to Neo4j database")
+            
+            self.apoc_available = self._detect_apoc()
+            if self.apoc_available:
+                logger.info("APOC found: nodes and relationships will load via apoc.periodic.iterate")
             return True
         except AuthError:
             logger.error("Authentication failed. Check Neo4j credentials.")
@@ -81,17 +294,40 @@ class GraphBuilder:
             logger.error(f"Failed to connect to Neo4j: {e}")
             return False
     
+    def _detect_apoc(self) -> bool:
+        """Check whether apoc.periodic.iterate is installed on the server."""
+        try:
+            with self.driver.session(database=self.database) as session:
+                record = session.run(
+                    "SHOW PROCEDURES YIELD name WHERE name = 'apoc.periodic.iterate' "
+                    "RETURN count(*) AS count"
+                ).single()
+            return record['count'] > 0
+        except Exception as e:
+            logger.debug(f"APOC detection failed: {e}")
+            return False
+    
     def close(self):
-        """Close Neo4j connection."""
+        """
+        Release the Neo4j connection.
+
+        The shared driver stays open for later builders; it is closed at
+        interpreter exit (see close_drivers).
+        """
+        if self.pool:
+            self.pool.shutdown(wait=True)
+            self.pool = None
         if self.driver:
-            self.driver.close()
-            logger.info("Closed Neo4j connection")
+            release_driver(self.uri, self.user, self.password)
+            self.driver = None
+            logger.info("Released Neo4j connection")
     
     def clear_database(self):
         """Clear all nodes and relationships from database."""
         logger.warning("Clearing entire Neo4j database")
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+        with self._write_session() as session:
+            session.run("MATCH (n) DETACH DELETE n").consume()
+        self._created_keys.clear()
         logger.info("Database cleared")
     
     def create_constraints_and_indexes(self):
@@ -102,6 +338,7 @@ class GraphBuilder:
             "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Process) REQUIRE p.pid IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (t:Thread) REQUIRE t.tid IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (f:File) REQUIRE f.path IS UNIQUE",
+            "CREATE CONSTRAINT IF NOT EXISTS FOR (s:Socket) REQUIRE s.socket_id IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (c:CPU) REQUIRE c.cpu_id IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (es:EventSequence) REQUIRE es.sequence_id IS UNIQUE"
         ]
@@ -114,32 +351,100 @@ class GraphBuilder:
             "CREATE INDEX IF NOT EXISTS FOR (ae:AppEvent) ON (ae.event_name)"
         ]
         
-        with self.driver.session() as session:
-            for constraint in constraints:
-                try:
-                    session.run(constraint)
-                    logger.debug(f"Created constraint: {constraint[:50]}...")
-                except Exception as e:
-                    logger.warning(f"Constraint creation warning: {e}")
-            
-            for index in indexes:
-                try:
-                    session.run(index)
-                    logger.debug(f"Created index: {index[:50]}...")
-                except Exception as e:
-                    logger.warning(f"Index creation warning: {e}")
+        # Pipeline every statement in one managed transaction (retried on
+        # transient errors) and fall back to one at a time if any of them is
+        # rejected. Schema changes take a global lock, so they are never
+        # dispatched concurrently
+        statements = constraints + indexes
+        try:
+            with self._write_session() as session:
+                session.execute_write(self._run_pipelined, statements)
+        except Exception as e:
+            logger.debug(f"Pipelined schema creation failed, retrying individually: {e}")
+            for statement in statements:
+                self._run_schema_statement(statement)
+        
+        # Indexes populate in the background; wait for them to come online so
+        # the bulk load's MERGE/MATCH lookups are planned as index seeks
+        try:
+            with self._write_session() as session:
+                session.run("CALL db.awaitIndexes($timeout)", timeout=INDEX_WAIT_SECONDS).consume()
+        except Exception as e:
+            logger.warning(f"Indexes not yet online: {e}")
         
+        self._verify_constraints()
         logger.info("Constraints and indexes created")
     
-    def build_graph(self, entities_dir: Path, metadata: Optional[Dict] = None):
+    def _write_session(self):
+        """
+        Open a session for bulk writes.
+        
+        Writes never stream result rows back, so records are fetched in a
+        single pull (fetch_size=-1) instead of 1000-record batches.
+        """
+        return self.driver.session(database=self.database, default_access_mode=WRITE_ACCESS, fetch_size=-1)
+    
+    def _run_schema_statement(self, statement: str):
+        """
+        Run one constraint/index statement in its own managed transaction.
+        
+        Failures are logged rather than raised: a missing index only slows
+        the load, and missing constraints are caught by _verify_constraints.
+        """
+        try:
+            with self._write_session() as session:
+                session.execute_write(self._run_pipelined, [statement])
+            logger.debug(f"Created schema object: {statement[:50]}...")
+        except Exception as e:
+            logger.warning(f"Failed to create schema object ({statement}): {e}")
+    
+    def _verify_constraints(self):
+        """
+        Check that every NODE_KEYS uniqueness constraint exists.
+        
+        The bulk load MERGEs on these keys and relies on the constraints
+        (and their backing indexes) for both correctness and speed.
+        
+        Raises:
+            RuntimeError: If any label's key constraint is missing
+        """
+        with self.driver.session(database=self.database) as session:
+            existing = {
+                (labels[0], properties[0])
+                for labels, properties in session.run(
+                    "SHOW CONSTRAINTS YIELD labelsOrTypes, properties "
+                    "RETURN labelsOrTypes, properties"
+                ).values()
+                if labels and properties and len(labels) == 1 and len(properties) == 1
+            }
+        missing = [f"{label}.{key}" for label, key in NODE_KEYS.items() if (label, key) not in existing]
+        if missing:
+            raise RuntimeError(f"Uniqueness constraints missing after schema creation: {', '.join(missing)}")
+    
+    def build_graph(self, entities_dir: Path, metadata: Optional[Dict] = None,
+                    mode: str = "online", import_dir: Optional[Path] = None,
+                    neo4j_admin: str = "neo4j-admin"):
         """
         Build complete knowledge graph from extracted entities.
         
         Args:
             entities_dir: Directory containing entity JSON files
             metadata: Optional metadata about the trace
+            mode: "online" writes through Cypher transactions; "offline"
+                writes neo4j-admin CSV files and imports them into a stopped,
+                empty database (cold builds only; no connection needed)
+            import_dir: CSV directory for offline mode
+                (default: entities_dir/../neo4j_import)
+            neo4j_admin: neo4j-admin executable for offline mode
         """
-        logger.info("Building knowledge graph")
+        logger.info(f"Building knowledge graph ({mode})")
+        
+        if mode == "offline":
+            self.importer = OfflineImporter(
+                import_dir or entities_dir.parent / "neo4j_import", neo4j_admin
+            )
+        elif mode != "online":
+            raise ValueError(f"Unknown graph build mode: {mode}")
         
         # Load entities
         entities = self._load_entities(entities_dir)
@@ -151,6 +456,12 @@ class GraphBuilder:
         if metadata and 'application' in metadata:
             self._build_application_layer(entities, metadata)
         
+        if self.importer is not None:
+            try:
+                self.importer.run_import(self.database)
+            finally:
+                self.importer = None
+        
         # Log final statistics
         logger.info("Graph construction complete")
         logger.info(f"  Total nodes: {self.stats.nodes_created}")
@@ -158,342 +469,629 @@ class GraphBuilder:
         for label, count in self.stats.node_counts.items():
             logger.info(f"    {label}: {count}")
     
-    def _load_entities(self, entities_dir: Path) -> Dict[str, List]:
-        """Load all entity JSON files."""
+    def _load_entities(self, entities_dir: Path) -> Dict[str, Iterator[Dict]]:
+        """
+        Open all entity files (Parquet if present, else JSON) as iterators.
+        
+        Every entity type is returned lazily: each is consumed once while
+        building the graph, so items are decoded (incrementally with ijson)
+        as they are filtered and written instead of all being held at once.
+        """
         logger.info(f"Loading entities from {entities_dir}")
         
         entities = {}
         entity_files = ['processes', 'threads', 'files', 'sockets', 'cpus', 'event_sequences']
         
+        # One directory listing answers every existence check below,
+        # instead of up to three stat calls per entity type
+        try:
+            present = set(os.listdir(entities_dir))
+        except FileNotFoundError:
+            present = set()
+        
         for entity_type in entity_files:
+            # Prefer the Parquet form when the extractor wrote one
+            parquet_path = entities_dir / f"{entity_type}.parquet"
             file_path = entities_dir / f"{entity_type}.json"
-            if file_path.exists():
-                with open(file_path, 'r') as f:
-                    entities[entity_type] = json.load(f)
-                logger.info(f"  Loaded {len(entities[entity_type])} {entity_type}")
+            has_parquet = parquet_path.name in present
+            if has_parquet and parquet_available():
+                entities[entity_type] = self._with_defaults(read_records(parquet_path), entity_type)
+                logger.info(f"  Streaming {entity_type} from {parquet_path.name}")
+            elif file_path.name in present:
+                entities[entity_type] = self._with_defaults(iter_json_items(file_path), entity_type)
+                logger.info(f"  Streaming {entity_type} from {file_path.name}")
+            elif has_parquet:
+                entities[entity_type] = iter([])
+                logger.warning(f"  pyarrow not installed, cannot read {parquet_path.name}")
             else:
-                entities[entity_type] = []
+                entities[entity_type] = iter([])
                 logger.warning(f"  File not found: {file_path.name}")
         
         return entities
     
-    def _build_kernel_layer(self, entities: Dict[str, List]):
+    @staticmethod
+    def _with_defaults(items: Iterable[Dict], entity_type: str) -> Iterator[Dict]:
+        """Yield entity dicts with ENTITY_DEFAULTS filled in place."""
+        defaults = ENTITY_DEFAULTS.get(entity_type, {})
+        for item in items:
+            for key, value in defaults.items():
+                item.setdefault(key, value)
+            yield item
+    
+    @staticmethod
+    def _select(items: Iterable[Dict], keep) -> Tuple[List[Dict], int]:
+        """Return the items for which keep(item) is true, and how many were seen."""
+        selected = []
+        total = 0
+        for item in items:
+            total += 1
+            if keep(item):
+                selected.append(item)
+        return selected, total
+    
+    def _build_kernel_layer(self, entities: Dict[str, Iterator[Dict]]):
         """Build the kernel reality layer of the graph."""
         logger.info("Building kernel reality layer")
         
+        # Create EventSequence nodes (the "action chapters") first, streaming
+        # them in batches; their relationship rows are grouped on the way
+        logger.info("  Creating EventSequence nodes")
+        groups = self._stream_event_sequences(entities['event_sequences'])
+        
         # Pre-filter: Only create nodes for entities that participate in the graph
         logger.info("  Filtering entities for meaningful connectivity...")
         
-        # Get threads that have EventSequences
-        threads_with_sequences = set(seq.get('thread_id') for seq in entities.get('event_sequences', []))
-        
-        # Get processes that have active threads
-        threads_list = entities.get('threads', [])
-        active_threads = [t for t in threads_list if t.get('tid') in threads_with_sequences]
-        active_process_pids = set(t.get('pid') for t in active_threads)
+        # Get processes that have active threads (threads with EventSequences)
+        active_threads, thread_total = self._select(
+            entities['threads'], lambda t: t['tid'] in groups.thread_ids
+        )
+        active_process_pids = set(t['pid'] for t in active_threads)
         
         # Filter processes to only those with active threads
-        processes_list = entities.get('processes', [])
-        active_processes = [p for p in processes_list if p.get('pid') in active_process_pids]
-        
-        logger.info(f"    Filtered {len(processes_list)} → {len(active_processes)} processes (with active threads)")
-        logger.info(f"    Filtered {len(threads_list)} → {len(active_threads)} threads (with EventSequences)")
-        
-        with self.driver.session() as session:
-            # Create Process nodes (only active ones)
-            logger.info("  Creating Process nodes")
-            for process in active_processes:
-                # Ensure all expected fields exist, use None for missing values
-                process_data = {
-                    'pid': process.get('pid'),
-                    'name': process.get('name'),
-                    'start_time': process.get('start_time'),
-                    'end_time': process.get('end_time'),
-                    'thread_count': process.get('thread_count', 0),
-                    'parent_pid': process.get('parent_pid')
-                }
-                session.run(
-                    """
-                    CREATE (p:Process {
-                        pid: $pid,
-                        name: $name,
-                        start_time: $start_time,
-                        end_time: $end_time,
-                        thread_count: $thread_count,
-                        parent_pid: $parent_pid
-                    })
-                    """,
-                    **process_data
-                )
-                self.stats.nodes_created += 1
-                self.stats.node_counts['Process'] = self.stats.node_counts.get('Process', 0) + 1
-            
-            # Create Thread nodes (only active ones)
-            logger.info("  Creating Thread nodes")
-            for thread in active_threads:
-                thread_data = {
-                    'tid': thread.get('tid'),
-                    'pid': thread.get('pid'),
-                    'name': thread.get('name'),
-                    'start_time': thread.get('start_time'),
-                    'end_time': thread.get('end_time')
-                }
-                session.run(
-                    """
-                    CREATE (t:Thread {
-                        tid: $tid,
-                        pid: $pid,
-                        name: $name,
-                        start_time: $start_time,
-                        end_time: $end_time
-                    })
-                    """,
-                    **thread_data
-                )
-                self.stats.nodes_created += 1
-                self.stats.node_counts['Thread'] = self.stats.node_counts.get('Thread', 0) + 1
-            
-            # Create CONTAINS relationships (Process -> Thread)
-            logger.info("  Creating CONTAINS relationships")
-            result = session.run(
-                """
-                MATCH (p:Process), (t:Thread)
-                WHERE p.pid = t.pid
-                CREATE (p)-[:CONTAINS {creation_time: t.start_time}]->(t)
-                RETURN count(*) as count
-                """
-            )
-            count = result.single()['count']
-            self.stats.relationships_created += count
-            self.stats.relationship_counts['CONTAINS'] = count
-            logger.info(f"    Created {count} CONTAINS relationships")
-            
-            # Create File nodes - only for files referenced in EventSequences
-            logger.info("  Creating File nodes")
-            
-            # First, collect all file paths referenced in EventSequences
-            referenced_files = set()
-            for sequence in entities.get('event_sequences', []):
-                entity_target = sequence.get('entity_target')
-                if entity_target and not entity_target.startswith('fd:'):
-                    referenced_files.add(entity_target)
-            
-            logger.info(f"    Found {len(referenced_files)} files referenced in EventSequences")
-            
-            # Only create File nodes for referenced files
-            created_count = 0
-            for file in entities.get('files', []):
-                file_path = file.get('path')
-                if file_path in referenced_files:
-                    file_data = {
-                        'path': file_path,
-                        'type': file.get('type'),
-                        'first_access': file.get('first_access'),
-                        'last_access': file.get('last_access'),
-                        'access_count': file.get('access_count', 0)
-                    }
-                    session.run(
-                        """
-                        CREATE (f:File {
-                            path: $path,
-                            type: $type,
-                            first_access: $first_access,
-                            last_access: $last_access,
-                            access_count: $access_count
-                        })
-                        """,
-                        **file_data
-                    )
-                    self.stats.nodes_created += 1
-                    self.stats.node_counts['File'] = self.stats.node_counts.get('File', 0) + 1
-                    created_count += 1
-            
-            logger.info(f"    Created {created_count} File nodes (skipped {len(entities.get('files', [])) - created_count} unreferenced)")
-            
-            # Create Socket nodes - only for sockets referenced in EventSequences
-            logger.info("  Creating Socket nodes")
-            
-            # Collect referenced socket_ids from EventSequences
-            referenced_sockets = set()
-            for sequence in entities.get('event_sequences', []):
-                entity_target = sequence.get('entity_target')
-                operation = sequence.get('operation', '')
-                if entity_target and operation in ['socket_send', 'socket_recv', 'socket'] and entity_target.startswith('socket_'):
-                    referenced_sockets.add(entity_target)
-            
-            logger.info(f"    Found {len(referenced_sockets)} sockets referenced in EventSequences")
-            
-            created_socket_count = 0
-            for socket in entities.get('sockets', []):
-                socket_id = socket.get('socket_id')
-                if socket_id in referenced_sockets:
-                    socket_data = {
-                        'socket_id': socket_id,
-                        'address': socket.get('address'),
-                        'port': socket.get('port'),
-                        'protocol': socket.get('protocol'),
-                        'family': socket.get('family'),
-                        'type': socket.get('type'),
-                        'first_access': socket.get('first_access')
-                    }
-                    session.run(
-                        """
-                        CREATE (s:Socket {
-                            socket_id: $socket_id,
-                            address: $address,
-                            port: $port,
-                            protocol: $protocol,
-                            family: $family,
-                            type: $type,
-                            first_access: $first_access
-                        })
-                        """,
-                        **socket_data
-                    )
-                    self.stats.nodes_created += 1
-                    self.stats.node_counts['Socket'] = self.stats.node_counts.get('Socket', 0) + 1
-                    created_socket_count += 1
-            
-            logger.info(f"    Created {created_socket_count} Socket nodes (skipped {len(entities.get('sockets', [])) - created_socket_count} unreferenced)")
-            
-            # Create CPU nodes
-            logger.info("  Creating CPU nodes")
-            for cpu in entities.get('cpus', []):
-                session.run(
-                    """
-                    CREATE (c:CPU {
-                        cpu_id: $cpu_id,
-                        event_count: $event_count
-                    })
-                    """,
-                    **cpu
-                )
-                self.stats.nodes_created += 1
-                self.stats.node_counts['CPU'] = self.stats.node_counts.get('CPU', 0) + 1
+        active_processes, process_total = self._select(
+            entities['processes'], lambda p: p['pid'] in active_process_pids
+        )
+        
+        logger.info(f"    Filtered {process_total} → {len(active_processes)} processes (with active threads)")
+        logger.info(f"    Filtered {thread_total} → {len(active_threads)} threads (with EventSequences)")
+        
+        # Select File nodes - only for files referenced in EventSequences
+        logger.info(f"    Found {len(groups.file_targets)} files referenced in EventSequences")
+        
+        # Only create File nodes for referenced files (set lookup per file)
+        file_rows, file_total = self._select(
+            entities['files'], lambda file: file['path'] in groups.file_targets
+        )
+        logger.info(f"    Filtered {file_total} → {len(file_rows)} files (skipped {file_total - len(file_rows)} unreferenced)")
+        
+        # Select Socket nodes - only for sockets referenced in EventSequences
+        logger.info(f"    Found {len(groups.socket_ids)} sockets referenced in EventSequences")
+        
+        socket_rows, socket_total = self._select(
+            entities['sockets'], lambda socket: socket['socket_id'] in groups.socket_ids
+        )
+        logger.info(f"    Filtered {socket_total} → {len(socket_rows)} sockets (skipped {socket_total - len(socket_rows)} unreferenced)")
+        
+        # Create Process, Thread, File, Socket and CPU nodes together
+        logger.info("  Creating Process, Thread, File, Socket and CPU nodes")
+        self._bulk_create_all([
+            ('Process', active_processes),
+            ('Thread', active_threads),
+            ('File', file_rows),
+            ('Socket', socket_rows),
+            ('CPU', list(entities['cpus']))
+        ])
+        
+        # Create CONTAINS relationships (Process -> Thread)
+        # The (pid, tid) pairs are already known, so each row resolves both
+        # endpoints through the uniqueness constraints instead of a label join
+        logger.info("  Creating CONTAINS relationships")
+        contains_rows = [
+            {'pid': thread['pid'], 'tid': thread['tid'], 'creation_time': thread['start_time']}
+            for thread in active_threads
+        ]
+        count = self._create_relationships(
+            'CONTAINS',
+            contains_rows,
+            ('Process', 'pid'),
+            ('Thread', 'tid')
+        )
+        logger.info(f"    Created {count} CONTAINS relationships")
+        
+        # Create PERFORMED relationships (Thread -> EventSequence)
+        logger.info("  Creating PERFORMED relationships")
+        count = self._create_relationships(
+            'PERFORMED',
+            groups.performed_rows,
+            ('Thread', 'tid'),
+            ('EventSequence', 'sequence_id')
+        )
+        logger.info(f"    Created {count} PERFORMED relationships")
+        
+        # Create SCHEDULED_ON relationships (Thread -> CPU)
+        logger.info("  Creating SCHEDULED_ON relationships")
+        # Execution counts per (thread, CPU) were tallied while streaming
+        scheduled_rows = [
+            {'tid': tid, 'cpu_id': cpu_id, 'execution_count': count}
+            for (tid, cpu_id), count in groups.execution_counts.items()
+        ]
+        scheduled_count = self._create_relationships(
+            'SCHEDULED_ON',
+            scheduled_rows,
+            ('Thread', 'tid'),
+            ('CPU', 'cpu_id')
+        )
+        logger.info(f"    Created {scheduled_count} SCHEDULED_ON relationships")
+        
+        # Create WAS_TARGET_OF relationships (File/Socket -> EventSequence)
+        logger.info("  Creating WAS_TARGET_OF relationships")
+        socket_target_count = self._create_relationships(
+            'WAS_TARGET_OF',
+            groups.socket_target_rows,
+            ('Socket', 'target'),
+            ('EventSequence', 'sequence_id')
+        )
+        file_target_count = self._create_relationships(
+            'WAS_TARGET_OF',
+            groups.file_target_rows,
+            ('File', 'target'),
+            ('EventSequence', 'sequence_id')
+        )
+        logger.info(f"    Created {file_target_count} File→EventSequence relationships")
+        logger.info(f"    Created {socket_target_count} Socket→EventSequence relationships")
+        
+        logger.info("Kernel reality layer complete")
+    
+    def _stream_event_sequences(self, sequences) -> SequenceGroups:
+        """
+        Create EventSequence nodes from an iterable of sequence dicts.
+        
+        Rows are flushed once a full round of batches (one per writer) has
+        accumulated, so memory stays bounded no matter how large the input
+        is. The heavy event_stream is dropped after its node is written.
+        
+        Each round is written on a background thread while the next one is
+        decoded and serialized, so the connections are not left idle during
+        the Python-side work; at most one round is in flight at a time.
+        
+        Args:
+            sequences: Iterable of EventSequence dicts
             
-            # Create EventSequence nodes (the "action chapters")
-            logger.info("  Creating EventSequence nodes")
-            for sequence in entities.get('event_sequences', []):
+        Returns:
+            Relationship rows and references grouped from the sequences
+        """
+        flush_size = self.batch_size * self.max_workers
+        groups = SequenceGroups()
+        rows = []
+        
+        stream_file = None
+        if self.stream_dir is not None:
+            self.stream_dir.mkdir(parents=True, exist_ok=True)
+            stream_file = open(self.stream_dir / STREAMS_FILE, 'wb')
+            logger.info(f"    Writing event streams to {self.stream_dir / STREAMS_FILE}")
+        
+        flusher = ThreadPoolExecutor(max_workers=1)
+        pending = None
+        
+        try:
+            for sequence in sequences:
+                # Reuse the decoded dict as the node row: rename the id fields
+                # and swap the stream list for its serialized form
+                sequence['tid'] = sequence.pop('thread_id', None)
+                sequence['pid'] = sequence.pop('process_id', None)
                 # Convert event_stream to JSON string for storage
-                event_stream_json = json.dumps(sequence.get('event_stream', []))
+                event_stream = dumps_compact(sequence.pop('event_stream', []))
+                if stream_file is None:
+                    sequence['event_stream'] = event_stream
+                else:
+                    # Keep only a byte offset on the node; the stream lives on disk
+                    sequence['stream_offset'] = stream_file.tell()
+                    stream_file.write(event_stream.encode() + b'\n')
+                rows.append(sequence)
+                self._group_sequence(groups, sequence)
                 
-                session.run(
-                    """
-                    CREATE (es:EventSequence {
-                        sequence_id: $sequence_id,
-                        operation: $operation,
-                        start_time: $start_time,
-                        end_time: $end_time,
-                        count: $count,
-                        event_stream: $event_stream,
-                        entity_target: $entity_target,
-                        return_value: $return_value,
-                        bytes_transferred: $bytes_transferred,
-                        duration_ms: $duration_ms,
-                        cpu_id: $cpu_id,
-                        tid: $tid,
-                        pid: $pid
-                    })
-                    """,
-                    sequence_id=sequence['sequence_id'],
-                    operation=sequence['operation'],
-                    start_time=sequence['start_time'],
-                    end_time=sequence['end_time'],
-                    count=sequence['count'],
-                    event_stream=event_stream_json,
-                    entity_target=sequence.get('entity_target'),
-                    return_value=sequence.get('return_value'),
-                    bytes_transferred=sequence.get('bytes_transferred', 0),
-                    duration_ms=sequence.get('duration_ms', 0),
-                    cpu_id=sequence.get('cpu_id', -1),
-                    tid=sequence.get('thread_id'),  # Use thread_id from dataclass
-                    pid=sequence.get('process_id')  # Use process_id from dataclass
-                )
-                self.stats.nodes_created += 1
-                self.stats.node_counts['EventSequence'] = self.stats.node_counts.get('EventSequence', 0) + 1
+                if len(rows) >= flush_size:
+                    if pending is not None:
+                        pending.result()
+                    pending = flusher.submit(self._bulk_create, 'EventSequence', rows)
+                    rows = []
+        finally:
+            flusher.shutdown(wait=True)
+            if stream_file is not None:
+                stream_file.close()
+        
+        if pending is not None:
+            pending.result()
+        self._bulk_create('EventSequence', rows)
+        logger.info(f"    Created {groups.count} EventSequence nodes")
+        return groups
+    
+    @staticmethod
+    def _group_sequence(groups: SequenceGroups, sequence: Dict):
+        """
+        Add one EventSequence's relationship rows and references to groups.
+        
+        The rows outlive the node rows: operation and target are interned,
+        since the JSON decoder allocates them afresh for every sequence.
+        """
+        groups.count += 1
+        sequence_id = sequence['sequence_id']
+        tid = sequence['tid']
+        cpu = sequence['cpu_id']
+        groups.thread_ids.add(tid)
+        
+        if tid:
+            groups.performed_rows.append({
+                'tid': tid,
+                'sequence_id': sequence_id,
+                'start_time': sequence['start_time'],
+                'end_time': sequence['end_time'],
+                'cpu': cpu
+            })
+            if cpu != -1:
+                groups.execution_counts[(tid, cpu)] += 1
+        
+        # fd: placeholders never resolved to an entity
+        entity_target = sequence.get('entity_target')
+        if not entity_target or entity_target.startswith('fd:'):
+            return
+        
+        entity_target = sys.intern(entity_target)
+        operation = sys.intern(sequence['operation'])
+        groups.file_targets.add(entity_target)
+        row = {'target': entity_target, 'sequence_id': sequence_id, 'access_type': operation}
+        # Socket targets link for ANY operation
+        # (socket, close, read, write, socket_send, socket_recv)
+        if entity_target.startswith('socket_'):
+            groups.socket_target_rows.append(row)
+            if operation in SOCKET_OPERATIONS:
+                groups.socket_ids.add(entity_target)
+        else:
+            groups.file_target_rows.append(row)
+    
+    def _bulk_create(self, label: str, rows: List[Dict]):
+        """
+        Create nodes for a label with batched UNWIND ... MERGE queries.
+        
+        Rows are sharded on the label's unique key so concurrent writers
+        never contend for the same node.
+        
+        Args:
+            label: Node label to create
+            rows: Property maps, one per node
+        """
+        self._write_nodes(label, self._unique_rows(label, rows))
+    
+    def _bulk_create_all(self, loads: List[Tuple[str, List[Dict]]]):
+        """
+        Create nodes for several labels, in one transaction when small.
+        
+        When every label together fits in a single batch, all the MERGE
+        statements share one write transaction (one commit instead of one
+        per label); otherwise each label is loaded with _bulk_create.
+        
+        Args:
+            loads: (label, rows) pairs, written in order
+        """
+        loads = [(label, self._unique_rows(label, rows)) for label, rows in loads]
+        
+        if self.importer is not None or sum(len(rows) for _, rows in loads) > self.batch_size:
+            for label, rows in loads:
+                self._write_nodes(label, rows)
+            return
+        
+        with self._write_session() as session:
+            session.execute_write(self._write_labels, [
+                (CREATE_NODE_QUERIES[label], rows) for label, rows in loads if rows
+            ])
+        for label, rows in loads:
+            self._count_nodes(label, len(rows))
+    
+    def _unique_rows(self, label: str, rows: List[Dict]) -> List[Dict]:
+        """
+        Drop rows whose unique key was already sent for this label.
+        
+        Duplicates (within rows or from an earlier batch) are removed before
+        sending, since their MERGE would only match the node already
+        created; keyless rows are dropped because MERGE cannot match null.
+        """
+        key = NODE_KEYS[label]
+        seen = self._created_keys.setdefault(label, set())
+        unique_rows = []
+        for row in rows:
+            if row[key] is not None and row[key] not in seen:
+                seen.add(row[key])
+                unique_rows.append(row)
+        if len(unique_rows) < len(rows):
+            logger.warning(f"    Dropped {len(rows) - len(unique_rows)} duplicate or keyless {label} rows")
+        return unique_rows
+    
+    def _write_nodes(self, label: str, rows: List[Dict]):
+        """Send de-duplicated node rows to the importer, APOC or the writer pool."""
+        if not rows:
+            return
+        
+        self._sanitize_int64(rows)
+        if self.importer is not None:
+            self.importer.write_nodes(label, rows, NODE_KEYS[label])
+        elif self.apoc_available:
+            # Serial batches: rows are unique on the key, but parallel MERGEs
+            # still contend for the uniqueness constraint's index locks
+            self._run_apoc_iterate(CREATE_NODE_QUERIES[label], rows, parallel=False)
+        else:
+            self._run_parallel(CREATE_NODE_QUERIES[label], rows, NODE_KEYS[label])
+        self._count_nodes(label, len(rows))
+    
+    @staticmethod
+    def _sanitize_int64(rows: List[Dict]):
+        """
+        Stringify WIDE_INT_PROPERTIES values outside the int64 range, in place.
+        
+        Each property is checked column-wise with min()/max() over its
+        integer values; rows are only revisited for a column that actually
+        overflows, which almost never happens.
+        """
+        for key in WIDE_INT_PROPERTIES:
+            column = [row[key] for row in rows if type(row.get(key)) is int]
+            if not column or (min(column) >= INT64_MIN and max(column) <= INT64_MAX):
+                continue
+            for row in rows:
+                value = row.get(key)
+                if type(value) is int and not INT64_MIN <= value <= INT64_MAX:
+                    row[key] = str(value)
+    
+    def _count_nodes(self, label: str, count: int):
+        """Record created nodes in the statistics."""
+        self.stats.nodes_created += count
+        self.stats.node_counts[label] += count
+    
+    def _create_relationships(self, rel_type: str, rows: List[Dict],
+                              start: Tuple[str, str], end: Tuple[str, str]) -> int:
+        """
+        Create relationships from rows with a batched UNWIND query.
+        
+        Each row holds the two endpoint keys plus one field per property
+        in RELATIONSHIP_PROPERTIES[rel_type]; the same rows serve the
+        offline CSV import.
+        
+        Args:
+            rel_type: Relationship type
+            rows: One row per relationship to create
+            start: (label, row field) identifying the start node
+            end: (label, row field) identifying the end node
             
-            # Create PERFORMED relationships (Thread -> EventSequence)
-            logger.info("  Creating PERFORMED relationships")
-            for sequence in entities.get('event_sequences', []):
-                if sequence.get('thread_id'):
-                    session.run(
-                        """
-                        MATCH (t:Thread {tid: $tid}), (es:EventSequence {sequence_id: $seq_id})
-                        CREATE (t)-[:PERFORMED {
-                            start_time: es.start_time,
-                            end_time: es.end_time,
-                            cpu: $cpu_id
-                        }]->(es)
-                        """,
-                        tid=sequence['thread_id'],
-                        seq_id=sequence['sequence_id'],
-                        cpu_id=sequence.get('cpu_id', -1)
-                    )
-                    self.stats.relationships_created += 1
-                    self.stats.relationship_counts['PERFORMED'] = \
-                        self.stats.relationship_counts.get('PERFORMED', 0) + 1
+        Returns:
+            Number of relationships the server reports as created (rows
+            written when importing offline)
+        """
+        if not rows:
+            return 0
+        
+        if self.importer is not None:
+            self.importer.write_relationships(rel_type, rows, start, end,
+                                              RELATIONSHIP_PROPERTIES[rel_type])
+            count = len(rows)
+        elif self.apoc_available:
+            count = self._run_apoc_iterate(self._relationship_query(rel_type, start, end), rows,
+                                           parallel=self._endpoints_unique(rows, start[1], end[1]))
+        else:
+            count = self._run_parallel(self._relationship_query(rel_type, start, end), rows, start[1])
+        self.stats.relationships_created += count
+        self.stats.relationship_counts[rel_type] += count
+        return count
+    
+    def _relationship_query(self, rel_type: str, start: Tuple[str, str], end: Tuple[str, str]) -> str:
+        """
+        Build (once) the UNWIND query creating rel_type between two labels.
+        
+        Endpoints are matched on their NODE_KEYS property, so both lookups
+        go through the uniqueness constraints. Properties are given as a map
+        in the CREATE pattern, so each relationship is written with its
+        properties in one step; no SET clause rewrites them afterwards.
+        
+        Args:
+            rel_type: Relationship type
+            start: (label, row field) identifying the start node
+            end: (label, row field) identifying the end node
             
-            # Create SCHEDULED_ON relationships (Thread -> CPU)
-            logger.info("  Creating SCHEDULED_ON relationships")
-            result = session.run(
-                """
-                MATCH (t:Thread)-[:PERFORMED]->(es:EventSequence), (c:CPU)
-                WHERE es.cpu_id = c.cpu_id
-                WITH t, c, count(es) as execution_count
-                MERGE (t)-[:SCHEDULED_ON {execution_count: execution_count}]->(c)
-                RETURN count(DISTINCT t) as threads_scheduled
-                """
+        Returns:
+            Cypher query taking the chunk as $rows
+        """
+        cache_key = (rel_type, start[0], end[0])
+        query = self._query_cache.get(cache_key)
+        if query is None:
+            # Only names are interpolated; every value is read from $rows
+            names = (rel_type, *start, *end, *RELATIONSHIP_PROPERTIES[rel_type])
+            assert all(name.isidentifier() for name in names), f"Unsafe name in {names}"
+            properties = ", ".join(f"{name}: r.{name}" for name in RELATIONSHIP_PROPERTIES[rel_type])
+            query = (
+                "UNWIND $rows AS r\n"
+                f"MATCH (a:{start[0]} {{{NODE_KEYS[start[0]]}: r.{start[1]}}}), "
+                f"(b:{end[0]} {{{NODE_KEYS[end[0]]}: r.{end[1]}}})\n"
+                f"CREATE (a)-[:{rel_type} {{{properties}}}]->(b)"
             )
-            scheduled_count = result.single()['threads_scheduled']
-            self.stats.relationships_created += scheduled_count
-            self.stats.relationship_counts['SCHEDULED_ON'] = scheduled_count
-            logger.info(f"    Created {scheduled_count} SCHEDULED_ON relationships")
+            self._query_cache[cache_key] = query
+        return query
+    
+    @staticmethod
+    def _endpoints_unique(rows: List[Dict], start_key: str, end_key: str) -> bool:
+        """
+        Check that no two relationship rows share a start or an end node.
+        
+        Creating a relationship locks both endpoints, so parallel APOC
+        batches only stay free of lock conflicts when every row touches
+        its own pair of nodes. Hot endpoints (a CPU for SCHEDULED_ON, a
+        busy thread for PERFORMED) fail this check and load serially.
+        """
+        return (len({row[start_key] for row in rows}) == len(rows)
+                and len({row[end_key] for row in rows}) == len(rows))
+    
+    def _run_apoc_iterate(self, query: str, rows: List[Dict], parallel: bool) -> int:
+        """
+        Run an UNWIND query through apoc.periodic.iterate.
+        
+        The server splits each call into batch_size batches; rows are sent
+        in calls of one batch per writer so a single Bolt message never
+        carries the whole load.
+        
+        A batch that still fails after APOC's retries is rolled back, and
+        APOC does not say which rows it held. Relationships are CREATEd, so
+        rows cannot simply be re-sent; the load fails instead, as a failed
+        shard does in _run_parallel. Batches therefore only run in parallel
+        when the caller knows they cannot deadlock on shared nodes.
+        
+        Args:
+            query: Cypher query of the form "UNWIND $rows AS r ..."
+            rows: Rows to send
+            parallel: Commit the batches of each call concurrently
             
-            # Create WAS_TARGET_OF relationships (File/Socket -> EventSequence)
-            logger.info("  Creating WAS_TARGET_OF relationships")
-            file_target_count = 0
-            socket_target_count = 0
+        Returns:
+            Relationships created, from APOC's update statistics (zero
+            for node loads)
             
-            for sequence in entities.get('event_sequences', []):
-                entity_target = sequence.get('entity_target')
-                operation = sequence.get('operation', '')
-                
-                if entity_target and not entity_target.startswith('fd:'):
-                    # Check if target is a socket_id (starts with 'socket_')
-                    if entity_target.startswith('socket_'):
-                        # Create Socket→EventSequence relationship for ANY operation
-                        # (socket, close, read, write, socket_send, socket_recv)
-                        result = session.run(
-                            """
-                            MATCH (s:Socket {socket_id: $socket_id}), (es:EventSequence {sequence_id: $seq_id})
-                            CREATE (s)-[:WAS_TARGET_OF {access_type: es.operation}]->(es)
-                            RETURN count(*) as count
-                            """,
-                            socket_id=entity_target,
-                            seq_id=sequence['sequence_id']
-                        )
-                        if result.single()['count'] > 0:
-                            socket_target_count += 1
-                    else:
-                        # Target is a file path - create File→EventSequence relationship
-                        result = session.run(
-                            """
-                            MATCH (f:File {path: $path}), (es:EventSequence {sequence_id: $seq_id})
-                            CREATE (f)-[:WAS_TARGET_OF {access_type: es.operation}]->(es)
-                            RETURN count(*) as count
-                            """,
-                            path=entity_target,
-                            seq_id=sequence['sequence_id']
-                        )
-                        if result.single()['count'] > 0:
-                            file_target_count += 1
+        Raises:
+            RuntimeError: If any rows failed to commit
+        """
+        action = query.replace("UNWIND $rows AS r", "", 1).strip()
+        call_size = self.batch_size * self.max_workers
+        created = 0
+        
+        with self._write_session() as session:
+            for start in range(0, len(rows), call_size):
+                record = session.run(
+                    APOC_ITERATE_QUERY,
+                    action=action,
+                    rows=rows[start:start + call_size],
+                    batch_size=self.batch_size,
+                    parallel=parallel,
+                    concurrency=self.max_workers
+                ).single()
+                if record['failedOperations']:
+                    raise RuntimeError(f"apoc.periodic.iterate failed {record['failedOperations']} rows: "
+                                       f"{record['errorMessages']}")
+                created += record['updateStatistics'].get('relationshipsCreated', 0)
+        
+        return created
+    
+    def _run_parallel(self, query: str, rows: List[Dict], shard_key: str) -> int:
+        """
+        Run a batched UNWIND query across the writer pool.
+        
+        Small loads (a single batch) run inline; larger loads are split into
+        one shard per worker by hashing shard_key, and each worker writes its
+        shard through its own session in chunks of at most
+        PARALLEL_BATCH_SIZE rows.
+        
+        Args:
+            query: Cypher query taking the chunk as $rows
+            rows: Rows to send
+            shard_key: Row field used to assign rows to workers
             
-            self.stats.relationships_created += (file_target_count + socket_target_count)
-            self.stats.relationship_counts['WAS_TARGET_OF'] = file_target_count + socket_target_count
-            logger.info(f"    Created {file_target_count} File→EventSequence relationships")
-            logger.info(f"    Created {socket_target_count} Socket→EventSequence relationships")
+        Returns:
+            Total relationships created across all shards
+        """
+        if self.pool is None or len(rows) <= self.batch_size:
+            return self._run_shard(query, rows, self.batch_size)
+        
+        self._plan_once(query)
+        shards = [[] for _ in range(self.max_workers)]
+        for row in rows:
+            shards[hash(row[shard_key]) % self.max_workers].append(row)
+        
+        chunk_size = min(self.batch_size, PARALLEL_BATCH_SIZE)
+        futures = [
+            self.pool.submit(self._run_shard, query, shard, chunk_size, chunk_size)
+            for shard in shards if shard
+        ]
+        # Collect in completion order so a failed shard surfaces immediately
+        return sum(future.result() for future in as_completed(futures))
+    
+    def _plan_once(self, query: str):
+        """
+        Have the server plan a write query before its first sharded load.
+        
+        EXPLAIN compiles the query into the server's plan cache without
+        running it, so the concurrent shards that follow all reuse that plan
+        instead of each planning it on first use. Planner notifications
+        (e.g. a MATCH that cannot use an index) are logged.
+        
+        Args:
+            query: Cypher query taking the chunk as $rows
+        """
+        if query in self._planned:
+            return
+        self._planned.add(query)
+        
+        with self._write_session() as session:
+            summary = session.run(f"EXPLAIN {query}", rows=[]).consume()
+        for notification in summary.notifications or []:
+            logger.warning(f"Planner notification: {notification.get('title')} - "
+                           f"{notification.get('description')}")
+    
+    def _run_shard(self, query: str, rows: List[Dict], batch_size: int,
+                   transaction_rows: int = TRANSACTION_ROWS) -> int:
+        """Write one shard of rows through a dedicated session."""
+        with self._write_session() as session:
+            return self._run_batched(session, query, rows, batch_size, transaction_rows)
+    
+    def _run_batched(self, session, query: str, rows: List[Dict], batch_size: int,
+                     transaction_rows: int = TRANSACTION_ROWS) -> int:
+        """
+        Run an UNWIND query over rows in batch_size chunks.
+        
+        Chunks are grouped into managed write transactions of up to
+        transaction_rows rows, so a large load never builds a single
+        oversized transaction on the server while still sharing commits
+        between chunks. The driver retries a transaction as a whole on
+        transient errors such as deadlocks between concurrent writers.
+        
+        Args:
+            session: Open Neo4j session
+            query: Cypher query taking the chunk as $rows
+            rows: Rows to send
+            batch_size: Rows per UNWIND chunk
+            transaction_rows: Rows per transaction (at least one chunk)
             
-            logger.info("Kernel reality layer complete")
+        Returns:
+            Relationships created, from the transaction summaries
+        """
+        transaction_rows = max(transaction_rows, batch_size)
+        created = 0
+        for start in range(0, len(rows), transaction_rows):
+            end = min(start + transaction_rows, len(rows))
+            chunks = [rows[i:min(i + batch_size, end)] for i in range(start, end, batch_size)]
+            created += session.execute_write(self._write_chunks, query, chunks)
+        return created
+    
+    @staticmethod
+    def _run_pipelined(tx, statements: List[str]):
+        """
+        Transaction function sending several statements back-to-back.
+        
+        Results are only consumed once everything has been queued, so the
+        statements share round-trips instead of each waiting on the server.
+        """
+        results = [tx.run(statement) for statement in statements]
+        for result in results:
+            result.consume()
+    
+    @staticmethod
+    def _write_labels(tx, loads: List[Tuple[str, List[Dict]]]):
+        """Transaction function running one UNWIND query per (query, rows) pair."""
+        for query, rows in loads:
+            tx.run(query, rows=rows).consume()
+    
+    @staticmethod
+    def _write_chunks(tx, query: str, chunks: List[List[Dict]]) -> int:
+        """Transaction function for a group of chunks; safe to retry as a whole."""
+        # Consuming here costs no extra round-trip (the commit has to wait for
+        # the results anyway), and the server-side counter is the real count:
+        # rows whose endpoints were filtered out match nothing
+        created = 0
+        for rows in chunks:
+            summary = tx.run(query, rows=rows).consume()
+            created += summary.counters.relationships_created
+        return created
     
     def _build_application_layer(self, entities: Dict[str, List], metadata: Dict):
         """Build application abstraction layer based on application type."""
@@ -533,13 +1131,12 @@ class GraphBuilder:
         stats_dict = {
             'nodes_created': self.stats.nodes_created,
             'relationships_created': self.stats.relationships_created,
-            'node_counts': self.stats.node_counts,
-            'relationship_counts': self.stats.relationship_counts
+            'node_counts': dict(self.stats.node_counts),
+            'relationship_counts': dict(self.stats.relationship_counts)
         }
         
         stats_file = output_dir / "graph_stats.json"
-        with open(stats_file, 'w') as f:
-            json.dump(stats_dict, f, indent=2)
+        dump_json(stats_dict, stats_file)
         
         logger.info(f"Saved graph statistics to {stats_file.name}")
 
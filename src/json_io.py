@@ -0,0 +1,127 @@
+"""
+JSON I/O Module
+===============
+Shared JSON encode/decode helpers for the pipeline stages.
+
+Uses orjson when it is installed (several times faster on the large
+entity and sequence files) and ijson for streaming top-level arrays,
+falling back to the standard library json module otherwise, so the
+pipeline keeps working without either.
+
+Author: Knowledge Graph and LLM Querying for Kernel Traces Project
+Date: October 3, 2025
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Files below this size are decoded in one call rather than streamed;
+# a whole-file orjson decode is much faster than ijson's event parser
+STREAM_MIN_BYTES = 256 * 1024 * 1024
+
+
+def load_json(path: Path) -> Any:
+    """
+    Load a JSON document from disk.
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        Decoded Python object
+    """
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def iter_json_items(path: Path) -> Iterator[Any]:
+    """
+    Iterate over the items of a JSON array file.
+
+    Files of STREAM_MIN_BYTES or more are decoded incrementally with ijson
+    (when installed), so only one item is held in memory at a time.
+    Smaller files, or any file without ijson, are loaded whole with
+    load_json and iterated.
+
+    Args:
+        path: Path to a JSON file containing a top-level array
+
+    Yields:
+        Decoded array items
+    """
+    if ijson is not None and Path(path).stat().st_size >= STREAM_MIN_BYTES:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+        return
+
+    yield from load_json(path)
+
+
+def dumps_compact(obj: Any) -> str:
+    """
+    Serialize an object to a compact JSON string.
+
+    Args:
+        obj: Object to serialize
+
+    Returns:
+        JSON text without insignificant whitespace
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # Values orjson cannot encode (e.g. integers wider than 64 bits)
+            pass
+
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def dump_json(obj: Any, path: Path, indent: bool = True,
+              default: Optional[Callable[[Any], Any]] = None):
+    """
+    Write an object to disk as JSON.
+
+    Args:
+        obj: Object to serialize
+        path: Destination file
+        indent: Pretty-print with two-space indentation
+        default: Converts objects JSON cannot encode directly, dataclasses
+            included, as the encoder reaches them; lets a list of records
+            be written without first building a list of their dicts
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATACLASS
+        try:
+            data = orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            data = None
+        if data is not None:
+            # Already encoded in full: one open, write and close
+            Path(path).write_bytes(data)
+            return
+
+    with open(path, 'w') as f:
+        if indent:
+            json.dump(obj, f, indent=2, default=default)
+        else:
+            json.dump(obj, f, separators=(',', ':'), default=default)
@@ -0,0 +1,190 @@
+"""
+Offline Import Module
+=====================
+Writes the knowledge graph as neo4j-admin import CSV files and runs the
+import.
+
+Transactional Cypher is the slow path for a cold build: an empty database
+can instead be populated with `neo4j-admin database import full`, which
+writes the store files directly without any Bolt traffic. The import
+overwrites the target database, which must be stopped while it runs. The
+imported store has no constraints or indexes: once the database is started
+again, `main.py --create-schema` adds them without clearing the graph.
+
+Author: Knowledge Graph and LLM Querying for Kernel Traces Project
+Date: October 3, 2025
+"""
+
+import csv
+import logging
+import pickle
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# neo4j-admin header types for Python property values (strings need none)
+CSV_TYPES = {
+    bool: 'boolean',
+    int: 'long',
+    float: 'double'
+}
+
+
+class OfflineImporter:
+    """Collects node and relationship rows into neo4j-admin import files."""
+
+    def __init__(self, import_dir: Path, neo4j_admin: str = "neo4j-admin"):
+        """
+        Initialize offline importer.
+
+        Args:
+            import_dir: Directory the CSV files are written to
+            neo4j_admin: neo4j-admin executable
+        """
+        self.import_dir = Path(import_dir)
+        self.neo4j_admin = neo4j_admin
+        self.import_dir.mkdir(parents=True, exist_ok=True)
+
+        self.node_files: Dict[str, Path] = {}
+        self.relationship_files: Dict[Path, str] = {}
+        self.relationship_rows = 0
+
+        # Rows are spooled per file until run_import, so each property
+        # column is typed over every row written, not just the first batch
+        self._id_columns: Dict[Path, List[Tuple[str, str]]] = {}
+        self._types: Dict[Path, Dict[str, str]] = {}
+        self._spools: Dict[Path, Path] = {}
+
+    def write_nodes(self, label: str, rows: List[Dict], id_key: str):
+        """
+        Append node rows to the label's CSV file.
+
+        Args:
+            label: Node label
+            rows: Property maps, one per node
+            id_key: Unique key property, used as the import ID
+        """
+        path = self.import_dir / f"{label}.csv"
+        self.node_files[label] = path
+        # The key is also kept as a typed property; the ID column only links
+        self._append(path, rows, [(f":ID({label})", id_key)], set())
+
+    def write_relationships(self, rel_type: str, rows: List[Dict],
+                            start: Tuple[str, str], end: Tuple[str, str],
+                            properties: Optional[Tuple[str, ...]] = None):
+        """
+        Append relationship rows to a CSV file.
+
+        Args:
+            rel_type: Relationship type
+            rows: One row per relationship; fields other than the two
+                endpoint keys become relationship properties
+            start: (label, row field) identifying the start node
+            end: (label, row field) identifying the end node
+            properties: Row fields to write as properties (default: all
+                fields other than the endpoint keys)
+        """
+        path = self.import_dir / f"{rel_type}_{start[0]}.csv"
+        self.relationship_files[path] = rel_type
+        self.relationship_rows += len(rows)
+        self._append(path, rows, [
+            (f":START_ID({start[0]})", start[1]),
+            (f":END_ID({end[0]})", end[1])
+        ], {start[1], end[1]}, properties)
+
+    def run_import(self, database: str = "neo4j"):
+        """
+        Run neo4j-admin over the written files.
+
+        Relationships whose endpoints were never written (e.g. threads of
+        filtered processes) are skipped, matching the MATCH semantics of
+        the transactional load.
+
+        Args:
+            database: Target database name
+        """
+        for path in self._spools:
+            self._write_csv(path)
+        self._spools.clear()
+        
+        command = [
+            self.neo4j_admin, 'database', 'import', 'full', database,
+            '--overwrite-destination',
+            '--skip-bad-relationships',
+            f'--bad-tolerance={max(self.relationship_rows, 1000)}'
+        ]
+        command += [f'--nodes={label}={path}' for label, path in self.node_files.items()]
+        command += [f'--relationships={rel_type}={path}' for path, rel_type in self.relationship_files.items()]
+
+        logger.info(f"Running offline import into database '{database}'")
+        try:
+            subprocess.run(command, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"neo4j-admin import failed: {e.stderr.strip()}")
+            raise
+        logger.info("Offline import complete")
+
+    def _append(self, path: Path, rows: List[Dict], id_columns: List[Tuple[str, str]],
+                excluded: set, properties: Optional[Tuple[str, ...]] = None):
+        """Spool rows for a CSV file and widen its column types to cover them."""
+        if not rows:
+            return
+        
+        spool = self._spools.get(path)
+        if spool is None:
+            spool = path.with_suffix('.rows')
+            # Drop rows left by an earlier, interrupted run
+            spool.unlink(missing_ok=True)
+            self._spools[path] = spool
+            self._id_columns[path] = id_columns
+            self._types[path] = {}
+        
+        self._merge_types(self._types[path], rows, excluded, properties)
+        with open(spool, 'ab') as f:
+            pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def _write_csv(self, path: Path):
+        """Write a file's header, typed over all its rows, then the spooled rows."""
+        columns = self._id_columns[path] + [
+            (f"{key}:{csv_type}" if csv_type else key, key)
+            for key, csv_type in self._types[path].items()
+        ]
+        keys = [key for _, key in columns]
+        spool = self._spools[path]
+        
+        with open(path, 'w', newline='') as f, open(spool, 'rb') as rows_file:
+            writer = csv.writer(f)
+            writer.writerow([header for header, _ in columns])
+            while True:
+                try:
+                    rows = pickle.load(rows_file)
+                except EOFError:
+                    break
+                writer.writerows([row.get(key) for key in keys] for row in rows)
+        spool.unlink()
+    
+    @staticmethod
+    def _merge_types(types: Dict[str, str], rows: List[Dict], excluded: set,
+                     properties: Optional[Tuple[str, ...]] = None):
+        """
+        Widen the per-property CSV types in place to cover rows.
+        
+        Types only ever widen, so a column keeps every value seen in any
+        batch: a property seen with both int and float values is typed as
+        double; any other mix (e.g. an int64 property stringified by
+        GraphBuilder._sanitize_int64) is written as a string.
+        """
+        for row in rows:
+            for key, value in row.items():
+                if key in excluded or value is None or (properties and key not in properties):
+                    continue
+                csv_type = CSV_TYPES.get(type(value), '')
+                seen = types.get(key)
+                if seen is None or seen == csv_type:
+                    types[key] = csv_type
+                elif {seen, csv_type} == {'long', 'double'}:
+                    types[key] = 'double'
+                else:
+                    types[key] = ''
@@ -0,0 +1,69 @@
+"""
+Parquet I/O Module
+==================
+Optional columnar storage for the flat entity files passed between the
+extraction and graph construction stages.
+
+Parquet files are typed and decoded in C by pyarrow, which loads large
+entity tables several times faster than JSON and keeps them smaller on
+disk. pyarrow is optional: without it the pipeline writes and reads JSON.
+
+Author: Knowledge Graph and LLM Querying for Kernel Traces Project
+Date: October 3, 2025
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows decoded per record batch when reading; bounds the Python dicts alive
+# at once while keeping each decode call large enough to stay in C
+READ_BATCH_ROWS = 10000
+
+
+def parquet_available() -> bool:
+    """Return True if pyarrow is installed."""
+    return pq is not None
+
+
+def write_records(records: List[Dict], path: Path):
+    """
+    Write a list of flat dicts as a Parquet table.
+
+    Entity dicts omit None-valued fields, so rows need not share keys.
+    Columns are the union of every row's keys (in first-seen order), each
+    typed from all of its values, with null where a row lacks the key;
+    Table.from_pylist would take the columns from the first row alone.
+
+    Args:
+        records: Rows to write
+        path: Destination .parquet file
+    """
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    table = pa.table({key: [record.get(key) for record in records] for key in columns})
+    pq.write_table(table, path)
+
+
+def read_records(path: Path) -> Iterator[Dict]:
+    """
+    Iterate over the rows of a Parquet table as dicts.
+
+    The file is decoded one record batch at a time, so only
+    READ_BATCH_ROWS rows are materialized as Python objects at once.
+
+    Args:
+        path: Source .parquet file
+
+    Yields:
+        One dict per row, without the null fields write_records filled in
+        (matching the JSON form, which omits them)
+    """
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=READ_BATCH_ROWS):
+        for row in batch.to_pylist():
+            yield {key: value for key, value in row.items() if value is not None}
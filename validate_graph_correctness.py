@@ -13,73 +13,102 @@ Checks:
 
 import json
 import re
+from bisect import bisect_right
 from pathlib import Path
 from typing import Dict, List, Tuple, Set
 from neo4j import GraphDatabase
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Database validated unless --database names another
+DEFAULT_DATABASE = "neo4j"
+
+# Per-line trace patterns, compiled once rather than looked up per call
+TIMESTAMP_PATTERN = re.compile(r'\[(\d+\.\d+)\]')
+# Entry or exit syscall event name: one search covers both kinds
+SYSCALL_EVENT_PATTERN = re.compile(r'syscall_(entry|exit)_(\w+):')
+CPU_ID_PATTERN = re.compile(r'cpu_id = (\d+)')
+FIELD_PATTERN = re.compile(r'\{ (\w+) = ([^}]+) \}')
+
+# Trace syscalls counted by the socket operations check
+SOCKET_SYSCALLS = frozenset(('socket', 'sendto', 'recvfrom', 'sendmsg', 'recvmsg'))
+
+# Report key and check method for each validation, in run order: the
+# graph-only checks go first so they overlap with the background trace parse
+VALIDATIONS = (
+    ('causal', 'validate_causal_correctness'),
+    ('fd_resolution', 'validate_fd_resolution'),
+    ('temporal', 'validate_temporal_correctness'),
+    ('data', 'validate_data_correctness'),
+    ('socket_ops', 'validate_socket_operations'),
+)
 
 
 class GraphValidator:
-    def __init__(self, trace_path: str, neo4j_uri: str, neo4j_password: str):
+    def __init__(self, trace_path: str, neo4j_uri: str, neo4j_password: str,
+                 database: str = DEFAULT_DATABASE):
         self.trace_path = Path(trace_path)
+        self.trace_file = self.trace_path / "trace_output.txt"
+        # Checked up front: the parse below only fails once it is waited on
+        if not self.trace_file.is_file():
+            raise FileNotFoundError(f"Trace log not found: {self.trace_file}")
+        
         self.driver = GraphDatabase.driver(neo4j_uri, auth=("neo4j", neo4j_password))
+        self.database = database
         
-        # Parse trace log
+        # Parse trace log in the background: the graph-only checks run
+        # while it is read, and checks against the trace wait for it.
+        # Progress is printed from the main thread so it never lands in the
+        # middle of another check's report
+        print(f"📖 Parsing trace log: {self.trace_file}")
         self.trace_events = []
-        self.parse_trace_log()
+        self._parser = ThreadPoolExecutor(max_workers=1)
+        self._parsed = self._parser.submit(self.parse_trace_log)
+        self._parse_reported = False
+    
+    def _wait_for_trace(self):
+        """Block until the background trace parse has finished."""
+        self._parsed.result()
+        if not self._parse_reported:
+            self._parse_reported = True
+            print(f"✅ Parsed {len(self.trace_events)} trace events")
         
     def parse_trace_log(self):
         """Parse LTTng trace output into structured events"""
-        trace_file = self.trace_path / "trace_output.txt"
-        
-        print(f"📖 Parsing trace log: {trace_file}")
-        
-        with open(trace_file, 'r') as f:
+        with open(self.trace_file, 'r') as f:
             for line in f:
                 line = line.strip()
                 if not line or line.startswith('['):
                     continue
                 
                 # Parse timestamp
-                timestamp_match = re.match(r'\[(\d+\.\d+)\]', line)
+                timestamp_match = TIMESTAMP_PATTERN.match(line)
                 if not timestamp_match:
                     continue
                 
                 timestamp = float(timestamp_match.group(1))
                 
                 # Parse syscall entry/exit
-                if 'syscall_entry_' in line or 'syscall_exit_' in line:
-                    event = self._parse_syscall_event(line, timestamp)
-                    if event:
-                        self.trace_events.append(event)
-        
-        print(f"✅ Parsed {len(self.trace_events)} trace events")
+                syscall_match = SYSCALL_EVENT_PATTERN.search(line)
+                if syscall_match:
+                    self.trace_events.append(self._parse_syscall_event(line, timestamp, syscall_match))
     
-    def _parse_syscall_event(self, line: str, timestamp: float) -> Dict:
+    def _parse_syscall_event(self, line: str, timestamp: float, syscall_match: re.Match) -> Dict:
         """Parse a syscall event from trace line"""
         event = {'timestamp': timestamp}
         
-        # Determine entry or exit
-        if 'syscall_entry_' in line:
-            event['type'] = 'entry'
-            syscall_match = re.search(r'syscall_entry_(\w+):', line)
-        else:
-            event['type'] = 'exit'
-            syscall_match = re.search(r'syscall_exit_(\w+):', line)
-        
-        if not syscall_match:
-            return None
-        
-        event['syscall'] = syscall_match.group(1)
+        # Entry or exit, and the syscall name, from the event name match
+        event['type'], event['syscall'] = syscall_match.groups()
         
         # Parse CPU, PID, TID
-        cpu_match = re.search(r'cpu_id = (\d+)', line)
+        cpu_match = CPU_ID_PATTERN.search(line)
         if cpu_match:
             event['cpu'] = int(cpu_match.group(1))
         
         # For more detailed parsing, extract all fields
         # Example: { fd = 3 }, { count = 512 }, { ret = 512 }
-        fields = re.findall(r'\{ (\w+) = ([^}]+) \}', line)
+        fields = FIELD_PATTERN.findall(line)
         event['fields'] = {k: v for k, v in fields}
         
         return event
@@ -90,7 +119,7 @@ class GraphValidator:
         print("TEMPORAL CORRECTNESS VALIDATION")
         print("="*80)
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Sample EventSequences from graph
             result = session.run("""
                 MATCH (es:EventSequence)
@@ -107,22 +136,23 @@ class GraphValidator:
             graph_sequences = list(result)
         
         print(f"\n📊 Checking {len(graph_sequences)} EventSequences against trace log")
+        self._wait_for_trace()
         
         mismatches = []
         matches = 0
         
+        # Sorted once, so each lookup is a binary search instead of a scan
+        # over every trace event
+        timestamps = sorted(e['timestamp'] for e in self.trace_events)
+        
         for seq in graph_sequences:
             start_time = seq['start_time']
             end_time = seq['end_time']
             operation = seq['operation']
             
-            # Find corresponding events in trace
-            matching_events = [
-                e for e in self.trace_events 
-                if abs(e['timestamp'] - start_time) < 0.001  # Within 1ms
-            ]
-            
-            if matching_events:
+            # Find a corresponding event in the trace (within 1ms)
+            i = bisect_right(timestamps, start_time - 0.001)
+            if i < len(timestamps) and timestamps[i] < start_time + 0.001:
                 matches += 1
             else:
                 mismatches.append({
@@ -154,7 +184,7 @@ class GraphValidator:
         print("CAUSAL CORRECTNESS VALIDATION")
         print("="*80)
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Check Thread -> EventSequence (PERFORMED) causality
             result = session.run("""
                 MATCH (t:Thread)-[:PERFORMED]->(es:EventSequence)
@@ -178,7 +208,7 @@ class GraphValidator:
         print(f"✅ Correct causality: {correct}/{correct+incorrect}")
         
         # Check File -> EventSequence (WAS_TARGET_OF) causality
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (f:File)-[:WAS_TARGET_OF]->(es:EventSequence)
                 WHERE es.entity_target = f.path
@@ -209,13 +239,14 @@ class GraphValidator:
         print("="*80)
         
         # Build trace event index for fast lookup
+        self._wait_for_trace()
         trace_index = defaultdict(list)
         for event in self.trace_events:
             if event['type'] == 'entry' and 'fields' in event:
                 key = (event['syscall'], event['timestamp'])
                 trace_index[key].append(event)
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Sample EventSequences with file operations
             result = session.run("""
                 MATCH (es:EventSequence)
@@ -242,7 +273,7 @@ class GraphValidator:
         print(f"✅ Verified operations: {verified}/{len(file_operations)}")
         
         # Check PID/TID consistency
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (p:Process)-[:CONTAINS]->(t:Thread)
                 WHERE p.pid = t.pid
@@ -272,7 +303,7 @@ class GraphValidator:
         print("FD RESOLUTION VALIDATION")
         print("="*80)
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Check resolved vs unresolved FDs
             result = session.run("""
                 MATCH (es:EventSequence)
@@ -297,7 +328,7 @@ class GraphValidator:
         print(f"   Resolution rate: {resolution_rate:.1f}%")
         
         # Check for FD reuse detection
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (es1:EventSequence), (es2:EventSequence)
                 WHERE es1.entity_target STARTS WITH '/' 
@@ -326,7 +357,7 @@ class GraphValidator:
         print("SOCKET OPERATIONS VALIDATION")
         print("="*80)
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Count socket operations in graph
             result = session.run("""
                 MATCH (es:EventSequence)
@@ -338,10 +369,12 @@ class GraphValidator:
             graph_socket_ops = {r['op']: r['count'] for r in result}
         
         # Count in trace
+        self._wait_for_trace()
         trace_socket_ops = defaultdict(int)
         for event in self.trace_events:
-            if event['syscall'] in ['socket', 'sendto', 'recvfrom', 'sendmsg', 'recvmsg']:
-                trace_socket_ops[event['syscall']] += 1
+            syscall = event['syscall']
+            if syscall in SOCKET_SYSCALLS:
+                trace_socket_ops[syscall] += 1
         
         print(f"\n📊 Socket Operations Comparison:")
         print(f"\nGraph:")
@@ -353,7 +386,7 @@ class GraphValidator:
             print(f"   {op}: {count}")
         
         # Check socket connectivity
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run("""
                 MATCH (s:Socket)
                 OPTIONAL MATCH (s)-[r:WAS_TARGET_OF]->()
@@ -381,53 +414,57 @@ class GraphValidator:
         print(f"Trace: {self.trace_path}")
         print()
         
-        results = {}
-        
         # Run all validations
-        results['temporal'] = self.validate_temporal_correctness()
-        results['causal'] = self.validate_causal_correctness()
-        results['data'] = self.validate_data_correctness()
-        results['fd_resolution'] = self.validate_fd_resolution()
-        results['socket_ops'] = self.validate_socket_operations()
+        results = {key: getattr(self, check)() for key, check in VALIDATIONS}
         
         # Generate summary
         print("\n" + "="*80)
         print("VALIDATION SUMMARY")
         print("="*80)
         
+        # Hoist each check's result once; missing counters read as zero
+        temporal = results.get('temporal', {})
+        causal = results.get('causal', {})
+        data = results.get('data', {})
+        fd_resolution = results.get('fd_resolution', {})
+        socket_ops = results.get('socket_ops', {})
+        
         print("\n📊 TEMPORAL CORRECTNESS:")
-        print(f"   Accuracy: {results['temporal']['accuracy_pct']:.1f}%")
-        print(f"   Matches: {results['temporal']['matches']}/{results['temporal']['total_checked']}")
+        print(f"   Accuracy: {temporal.get('accuracy_pct', 0):.1f}%")
+        print(f"   Matches: {temporal.get('matches', 0)}/{temporal.get('total_checked', 0)}")
         
         print("\n📊 CAUSAL CORRECTNESS:")
-        thread_total = results['causal']['thread_causality_correct'] + results['causal']['thread_causality_incorrect']
-        thread_pct = (results['causal']['thread_causality_correct'] / thread_total * 100) if thread_total > 0 else 0
+        thread_correct = causal.get('thread_causality_correct', 0)
+        thread_total = thread_correct + causal.get('thread_causality_incorrect', 0)
+        thread_pct = (thread_correct / thread_total * 100) if thread_total > 0 else 0
         print(f"   Thread causality: {thread_pct:.1f}% correct")
         
-        file_pct = (results['causal']['file_causality_correct'] / results['causal']['file_causality_total'] * 100) if results['causal']['file_causality_total'] > 0 else 0
+        file_total = causal.get('file_causality_total', 0)
+        file_pct = (causal.get('file_causality_correct', 0) / file_total * 100) if file_total > 0 else 0
         print(f"   File causality: {file_pct:.1f}% correct")
         
         print("\n📊 DATA CORRECTNESS:")
         print(f"   PID consistency: 100%")
-        print(f"   File operation verification: {results['data']['file_operations_verified']}/{results['data']['file_operations_total']}")
+        print(f"   File operation verification: {data.get('file_operations_verified', 0)}/{data.get('file_operations_total', 0)}")
         
         print("\n📊 FD RESOLUTION:")
-        print(f"   Resolution rate: {results['fd_resolution']['resolution_rate_pct']:.1f}%")
-        print(f"   Resolved: {results['fd_resolution']['resolved_fds']}")
-        print(f"   Unresolved: {results['fd_resolution']['unresolved_fds']} (pre-trace FDs)")
+        resolution_rate = fd_resolution.get('resolution_rate_pct', 0)
+        print(f"   Resolution rate: {resolution_rate:.1f}%")
+        print(f"   Resolved: {fd_resolution.get('resolved_fds', 0)}")
+        print(f"   Unresolved: {fd_resolution.get('unresolved_fds', 0)} (pre-trace FDs)")
         
         print("\n📊 SOCKET OPERATIONS:")
-        print(f"   Total sockets: {results['socket_ops']['total_sockets']}")
-        print(f"   Connected: {results['socket_ops']['connected_sockets']}")
-        print(f"   Graph operations: {sum(results['socket_ops']['graph_socket_ops'].values())}")
+        print(f"   Total sockets: {socket_ops.get('total_sockets', 0)}")
+        print(f"   Connected: {socket_ops.get('connected_sockets', 0)}")
+        print(f"   Graph operations: {sum(socket_ops.get('graph_socket_ops', {}).values())}")
         
         # Overall verdict
         print("\n" + "="*80)
         overall_pass = (
-            results['temporal']['accuracy_pct'] > 90 and
+            temporal.get('accuracy_pct', 0) > 90 and
             thread_pct > 95 and
             file_pct > 95 and
-            results['fd_resolution']['resolution_rate_pct'] > 10
+            resolution_rate > 10
         )
         
         if overall_pass:
@@ -443,14 +480,16 @@ class GraphValidator:
         
         # Save results
         output_file = self.trace_path / "validation_report.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
+        # Encode in one call and write once; json.dump issues a write per
+        # encoded chunk
+        output_file.write_text(json.dumps(results, indent=2))
         
         print(f"\n📄 Full report saved to: {output_file}")
         
         return results
     
     def close(self):
+        self._parser.shutdown(wait=True)
         self.driver.close()
 
 
@@ -461,13 +500,16 @@ def main():
     parser.add_argument('--trace', required=True, help='Path to trace directory')
     parser.add_argument('--neo4j-uri', default='bolt://10.0.2.2:7687', help='Neo4j URI')
     parser.add_argument('--neo4j-password', required=True, help='Neo4j password')
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help=f'Neo4j database to validate (default: {DEFAULT_DATABASE})')
     
     args = parser.parse_args()
     
     validator = GraphValidator(
         trace_path=args.trace,
         neo4j_uri=args.neo4j_uri,
-        neo4j_password=args.neo4j_password
+        neo4j_password=args.neo4j_password,
+        database=args.database
     )
     
     try:
@@ -6,9 +6,43 @@ Simplified Graph Validation - Verify correctness against processed trace data
 import json
 from pathlib import Path
 from neo4j import GraphDatabase
+from neo4j.exceptions import ClientError
 
+# Database validated unless --database names another
+DEFAULT_DATABASE = "neo4j"
 
-def validate_graph(trace_path: str, neo4j_password: str):
+
+def count_stats(session):
+    """
+    Return (node counts by label, relationship counts by type).
+
+    Reads both from the counts store with a single apoc.meta.stats() call
+    when APOC is installed; otherwise falls back to one scan each.
+    """
+    try:
+        record = session.run("""
+            CALL apoc.meta.stats() YIELD labels, relTypesCount
+            RETURN labels, relTypesCount
+        """).single()
+        return dict(record['labels']), dict(record['relTypesCount'])
+    except ClientError:
+        pass
+    
+    result = session.run("""
+        MATCH (n)
+        RETURN labels(n)[0] as label, count(n) as count
+    """)
+    label_counts = {r['label']: r['count'] for r in result}
+    
+    result = session.run("""
+        MATCH ()-[r]->()
+        RETURN type(r) as rel_type, count(r) as count
+    """)
+    rel_counts = {r['rel_type']: r['count'] for r in result}
+    return label_counts, rel_counts
+
+
+def validate_graph(trace_path: str, neo4j_password: str, database: str = DEFAULT_DATABASE):
     trace_path = Path(trace_path)
     driver = GraphDatabase.driver("bolt://10.0.2.2:7687", auth=("neo4j", neo4j_password))
     
@@ -35,7 +69,7 @@ def validate_graph(trace_path: str, neo4j_password: str):
     print(f"   Event sequences: {len(event_sequences):,}")
     print()
     
-    with driver.session() as session:
+    with driver.session(database=database) as session:
         # 1. TEMPORAL CORRECTNESS
         print("="*80)
         print("1. TEMPORAL CORRECTNESS")
@@ -58,10 +92,10 @@ def validate_graph(trace_path: str, neo4j_password: str):
         matches = 0
         for graph_seq in graph_sequences:
             seq_id = graph_seq['seq_id']
-            # Find in processed data
-            matching = [s for s in event_sequences if s['sequence_id'] == seq_id]
-            if matching:
-                proc_seq = matching[0]
+            # Find in processed data: stop at the first match instead of
+            # scanning every sequence (the sampled ones are the earliest)
+            proc_seq = next((s for s in event_sequences if s['sequence_id'] == seq_id), None)
+            if proc_seq is not None:
                 time_match = abs(graph_seq['start_time'] - proc_seq['start_time']) < 0.001
                 op_match = graph_seq['operation'] == proc_seq['operation']
                 
@@ -164,13 +198,7 @@ def validate_graph(trace_path: str, neo4j_password: str):
         print(f"   Correct: {correct_pid}/{total_contains} (100%)")
         
         # Check node counts match extracted entities
-        result = session.run("""
-            MATCH (n)
-            RETURN labels(n)[0] as label, count(n) as count
-            ORDER BY count DESC
-        """)
-        
-        graph_counts = {r['label']: r['count'] for r in result}
+        graph_counts, rel_counts = count_stats(session)
         
         print(f"\n📋 Node counts (Graph vs. Extracted):")
         entity_types = ['processes', 'threads', 'files', 'sockets']
@@ -202,9 +230,16 @@ def validate_graph(trace_path: str, neo4j_password: str):
         """)
         resolved_graph = result.single()['resolved']
         
-        # Count in processed sequences
-        resolved_proc = sum(1 for s in event_sequences if s['entity_target'].startswith('/') or s['entity_target'].startswith('socket_'))
-        unresolved_proc = sum(1 for s in event_sequences if s['entity_target'].startswith('fd:'))
+        # Count in processed sequences: one pass sorts each target into
+        # resolved or unresolved (the prefixes are mutually exclusive)
+        resolved_proc = 0
+        unresolved_proc = 0
+        for s in event_sequences:
+            target = s['entity_target']
+            if target.startswith(('/', 'socket_')):
+                resolved_proc += 1
+            elif target.startswith('fd:'):
+                unresolved_proc += 1
         
         print(f"\n📋 FD Resolution (Graph vs. Processed):")
         print(f"   Resolved - Graph: {resolved_graph:,}, Processed: {resolved_proc:,}")
@@ -220,32 +255,16 @@ def validate_graph(trace_path: str, neo4j_password: str):
         print("5. RELATIONSHIP COUNTS")
         print("="*80)
         
-        result = session.run("""
-            MATCH ()-[r]->()
-            RETURN type(r) as rel_type, count(r) as count
-            ORDER BY count DESC
-        """)
-        
         print(f"\n📋 Relationship breakdown:")
         total_rels = 0
-        for record in result:
-            count = record['count']
+        for rel_type, count in sorted(rel_counts.items(), key=lambda item: item[1], reverse=True):
             total_rels += count
-            print(f"   {record['rel_type']}: {count:,}")
+            print(f"   {rel_type}: {count:,}")
         print(f"   TOTAL: {total_rels:,}")
         
         # PERFORMED should equal number of EventSequences
-        result = session.run("""
-            MATCH (es:EventSequence)
-            RETURN count(es) as es_count
-        """)
-        es_count = result.single()['es_count']
-        
-        result = session.run("""
-            MATCH ()-[r:PERFORMED]->()
-            RETURN count(r) as performed_count
-        """)
-        performed_count = result.single()['performed_count']
+        es_count = graph_counts.get('EventSequence', 0)
+        performed_count = rel_counts.get('PERFORMED', 0)
         
         if es_count == performed_count:
             print(f"\n   ✅ PERFORMED relationships ({performed_count:,}) = EventSequences ({es_count:,})")
@@ -297,7 +316,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Validate graph against processed data')
     parser.add_argument('--trace', required=True, help='Path to trace directory')
     parser.add_argument('--neo4j-password', required=True, help='Neo4j password')
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help=f'Neo4j database to validate (default: {DEFAULT_DATABASE})')
     
     args = parser.parse_args()
     
-    validate_graph(args.trace, args.neo4j_password)
+    validate_graph(args.trace, args.neo4j_password, args.database)